@@ -0,0 +1,130 @@
+"""Cooking-log analytics: cooks per week or month, rating trends, streaks, neglected meals.
+
+Each result is one grouped SQL query over LogEntries (dates are ISO "YYYY-MM-DD", so
+SQLite's date functions bucket them and the date index serves range filters), or a
+small vectorized pass over its output. Results are cached per data version and
+parameters, and per day where "today" matters.
+"""
+from datetime import date
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from cache import VersionedCache
+
+
+analytics_cache = VersionedCache()
+
+# Start of the week (Monday) or month containing a log date
+PERIODS = {
+    "week": "date(l.date, 'weekday 0', '-6 days')",
+    "month": "strftime('%Y-%m-01', l.date)",
+}
+# The MealStats convention: a rating of 0 or none means "not rated"
+_RATED = "l.rating > 0"
+
+
+def _range(start, end):
+    clauses, params = [], {}
+    if start is not None:
+        clauses.append("l.date >= :start")
+        params["start"] = start.isoformat()
+    if end is not None:
+        clauses.append("l.date <= :end")
+        params["end"] = end.isoformat()
+    return "".join(f" AND {c}" for c in clauses), params
+
+
+def cooks_per_period(db: Session, period: str = "week", start: date = None, end: date = None) -> list[dict]:
+    """Log entries, distinct meals and average rating per week or month."""
+    def compute():
+        where, params = _range(start, end)
+        rows = db.connection().execute(text(f"""
+            SELECT {PERIODS[period]} period, count(*) cooks, count(DISTINCT l.meal_id) meals,
+                   avg(CASE WHEN {_RATED} THEN l.rating END) avg_rating
+            FROM LogEntries l
+            WHERE date(l.date) IS NOT NULL{where}
+            GROUP BY period
+            ORDER BY period
+        """), params)
+        return [r._asdict() for r in rows]
+    return analytics_cache.get(("cooks", period, start, end), compute)
+
+
+def rating_trend(db: Session, by: str = "cuisine", period: str = "month", meal_id: int = None,
+                 cuisine_type: str = None, start: date = None, end: date = None) -> list[dict]:
+    """Average rating per period for each cuisine (by="cuisine") or meal (by="meal")."""
+    def compute():
+        where, params = _range(start, end)
+        if meal_id is not None:
+            where += " AND l.meal_id = :meal_id"
+            params["meal_id"] = meal_id
+        if cuisine_type:
+            where += " AND m.cuisine_type = :cuisine_type"
+            params["cuisine_type"] = cuisine_type
+        key = "m.cuisine_type" if by == "cuisine" else "m.meal_id"
+        rows = db.connection().execute(text(f"""
+            SELECT {PERIODS[period]} period, {key} key, min(m.name) name,
+                   avg(l.rating) avg_rating, count(*) ratings
+            FROM LogEntries l JOIN Meals m ON m.meal_id = l.meal_id
+            WHERE {_RATED} AND date(l.date) IS NOT NULL{where}
+            GROUP BY period, {key}
+            ORDER BY period, {key}
+        """), params)
+        return [
+            {"period": r.period, "key": r.key, "name": r.name if by == "meal" else r.key,
+             "avg_rating": r.avg_rating, "ratings": r.ratings}
+            for r in rows
+        ]
+    return analytics_cache.get(("ratings", by, period, meal_id, cuisine_type, start, end), compute)
+
+
+def streaks(db: Session, today: date = None) -> dict:
+    """Runs of consecutive days with something cooked: the longest, and the current one
+    (still alive if the last cook was today or yesterday)."""
+    today = today or date.today()
+
+    def compute():
+        days = db.connection().execute(text(
+            "SELECT DISTINCT date(date) day FROM LogEntries WHERE date(date) IS NOT NULL ORDER BY day"
+        )).scalars().all()
+        result = {"days_cooked": len(days), "longest": 0, "longest_start": None, "longest_end": None,
+                  "current": 0, "current_start": None, "last_cooked": days[-1] if days else None}
+        if not days:
+            return result
+        ordinals = np.array([date.fromisoformat(d).toordinal() for d in days])
+        # A new run starts wherever the gap to the previous day isn't exactly one
+        starts = np.flatnonzero(np.r_[True, np.diff(ordinals) != 1])
+        lengths = np.diff(np.r_[starts, len(ordinals)])
+        best = int(np.argmax(lengths))
+        result.update(
+            longest=int(lengths[best]),
+            longest_start=days[starts[best]],
+            longest_end=days[starts[best] + lengths[best] - 1],
+        )
+        if today.toordinal() - ordinals[-1] <= 1:
+            result.update(current=int(lengths[-1]), current_start=days[starts[-1]])
+        return result
+    return analytics_cache.get(("streaks", today), compute)
+
+
+def longest_since_cooked(db: Session, limit: int = 20, min_cooks: int = 1, today: date = None) -> list[dict]:
+    """Meals cooked at least min_cooks times, the longest since last cooked first.
+
+    Reads the per-meal summaries (MealStats), not the log.
+    """
+    today = today or date.today()
+
+    def compute():
+        rows = db.connection().execute(text("""
+            SELECT m.meal_id, m.name, m.cuisine_type, s.recent_meal_date last_cooked, s.meal_count times_cooked,
+                   CAST(s.rating_sum AS REAL) / nullif(s.rating_count, 0) avg_rating,
+                   CAST(julianday(:today) - julianday(s.recent_meal_date) AS INTEGER) days_since
+            FROM MealStats s JOIN Meals m ON m.meal_id = s.meal_id
+            WHERE s.meal_count >= :min_cooks AND julianday(s.recent_meal_date) IS NOT NULL
+            ORDER BY s.recent_meal_date, m.meal_id
+            LIMIT :limit
+        """), {"today": today.isoformat(), "min_cooks": min_cooks, "limit": limit})
+        return [r._asdict() for r in rows]
+    return analytics_cache.get(("neglected", limit, min_cooks, today), compute)
@@ -0,0 +1,329 @@
+"""Benchmarks for the meal API, run in-process against a throwaway SQLite database.
+
+    python benchmark.py create --n 300
+    python benchmark.py load --n 400 --seed-meals 2000
+    python benchmark.py serialize --seed-meals 5000
+    python benchmark.py match --seed-meals 50000
+
+The suite runs every main endpoint against synthetic datasets (synthetic_data.py) of
+each size and writes p50/p95 latency, SQL statements per request and memory to JSON;
+compare two result files to spot regressions between commits:
+
+    python benchmark.py suite --sizes 1000 10000 100000 --out results.json
+    python benchmark.py compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+
+def _meal_payload(i: int, rng: random.Random) -> dict:
+    # Half the ingredients come from a small shared pantry, half are unique to the recipe
+    shared = [f"pantry item {rng.randrange(200)}" for _ in range(10)]
+    unique = [f"ingredient {i}-{k}" for k in range(10)]
+    return {
+        "name": f"Benchmark meal {i}",
+        "description": "Generated for benchmarking",
+        "cuisine_type": rng.choice(["American", "Italian", "Mexican", "Thai", "Indian"]),
+        "cooking_mode": rng.choice(["Bake", "Grill", "Stovetop", "Instant Pot"]),
+        "cooking_ease": rng.choice(["quick", "weeknight", "weekend"]),
+        "cooking_time": rng.randrange(10, 120),
+        "ingredients": [{"name": name, "quantity": 1, "unit": "cup"} for name in shared + unique],
+        "directions": [{"step_number": k, "description": f"Step {k} for meal {i}"} for k in range(1, 11)],
+        "log_entries": [{"date": f"2025-0{rng.randrange(1, 10)}-1{rng.randrange(10)}", "rating": rng.randrange(6)}
+                        for _ in range(2)],
+    }
+
+
+def bench_create(client, n: int, seed: int):
+    rng = random.Random(seed)
+    payloads = [_meal_payload(i, rng) for i in range(n)]
+    start = time.perf_counter()
+    for payload in payloads:
+        response = client.post("/meals/", json=payload)
+        response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    print(f"create_meal: {n} meals in {elapsed:.2f}s = {n / elapsed:.1f} creates/s "
+          f"(20 ingredients, 10 steps, 2 log entries each)")
+
+
+def _seed_body(n: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    return "\n".join(json.dumps(_meal_payload(i, rng)) for i in range(n)).encode()
+
+
+async def _load(app, path: str, n: int, seed_meals: int, seed: int):
+    """Requests/s for the same endpoint at rising concurrency; a blocked event loop stays flat.
+
+    Everything runs on one event loop: the async engine's connections belong to the
+    loop they were opened on.
+    """
+    import httpx
+    from db_config import async_engine
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        (await client.post("/meals/bulk", content=_seed_body(seed_meals, seed))).raise_for_status()
+        for concurrency in (1, 4, 16):
+            queue = iter(range(n))
+
+            async def worker():
+                for _ in queue:
+                    (await client.get(path)).raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+            print(f"GET {path}: concurrency {concurrency:>2}: {n / elapsed:.1f} req/s")
+    await async_engine.dispose()
+
+
+def bench_serialize(client, seed_meals: int, seed: int, page_size: int = 500, passes: int = 3):
+    """Time paging through every meal with GET /meals/: query, response building and JSON encoding."""
+    client.post("/meals/bulk", content=_seed_body(seed_meals, seed)).raise_for_status()
+    timings = []
+    for _ in range(passes):
+        after_id, count, size = 0, 0, 0
+        start = time.perf_counter()
+        while True:
+            response = client.get(f"/meals/?limit={page_size}&after_id={after_id}",
+                                  headers={"Accept-Encoding": "identity"})
+            response.raise_for_status()
+            page = response.json()
+            if not page:
+                break
+            count += len(page)
+            size += len(response.content)
+            after_id = page[-1]["meal_id"]
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"GET /meals/?limit={page_size}: {count} meals ({size / 1e6:.1f} MB) in {best:.2f}s "
+          f"= {count / best:.0f} meals/s (best of {passes})")
+
+
+def bench_match(client, seed_meals: int, seed: int, n: int, pantry_size: int = 100):
+    """Latency of ranking every meal against a pantry drawn from the shared ingredients."""
+    client.post("/meals/bulk", content=_seed_body(seed_meals, seed)).raise_for_status()
+    have = ",".join(f"pantry item {i}" for i in range(pantry_size))
+    client.get(f"/meals/match?have={have}").raise_for_status()  # builds the matrix
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        client.get(f"/meals/match?have={have}", headers={"If-None-Match": ""}).raise_for_status()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"GET /meals/match ({pantry_size} items, {seed_meals} meals): "
+          f"p50 {timings[len(timings) // 2] * 1000:.1f} ms, max {timings[-1] * 1000:.1f} ms")
+
+
+def _suite_endpoints(meals: int, rng: random.Random):
+    """(name, method, path or path factory, body) for each endpoint the suite measures."""
+    pantry = "onion,garlic,olive oil,salt,black pepper,tomato,rice,chicken breast,lemon,butter,egg,flour"
+    return [
+        ("GET /meals/", "GET", "/meals/?limit=50", None),
+        ("GET /meals/ filtered", "GET", "/meals/?cuisine_type=Italian&max_time=45&limit=50", None),
+        ("GET /meals/ deep page", "GET", lambda: f"/meals/?limit=50&after_id={rng.randrange(meals)}", None),
+        ("GET /meals/summary", "GET", "/meals/summary?limit=102", None),
+        ("GET /meals/{meal_id}", "GET", lambda: f"/meals/{rng.randrange(1, meals + 1)}", None),
+        ("GET /meals/search", "GET", "/meals/search?q=curry", None),
+        ("GET /meal/{meal_id}", "GET", lambda: f"/meal/{rng.randrange(1, meals + 1)}", None),
+        ("GET /dashboard", "GET", "/dashboard", None),
+        ("GET /api/dashboard", "GET", "/api/dashboard", None),
+        ("GET /meals/match", "GET", f"/meals/match?have={pantry}", None),
+        ("GET /recommendations", "GET", "/recommendations", None),
+        ("GET /plan", "GET", "/plan?days=7&max_total_time=300", None),
+        ("GET /api/analytics/cooks", "GET", "/api/analytics/cooks?period=month", None),
+        # Last: every create moves the data version, so the caches above start cold again
+        ("POST /meals/", "POST", "/meals/", lambda: _meal_payload(rng.randrange(10**9), rng)),
+    ]
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def bench_endpoints(client, meals: int, n: int, seed: int) -> dict:
+    """Per endpoint: the first (cold cache) call, then n timed calls and a few traced for memory."""
+    import metrics
+
+    rng = random.Random(seed)
+    results = {}
+    for name, method, path, body in _suite_endpoints(meals, rng):
+        def call():
+            url = path() if callable(path) else path
+            payload = body() if callable(body) else body
+            response = client.request(method, url, json=payload)
+            response.raise_for_status()
+            return response
+
+        start = time.perf_counter()
+        call()
+        first = time.perf_counter() - start
+
+        timings, sizes = [], []
+        statements_before = metrics.totals()["statements"]
+        for _ in range(n):
+            start = time.perf_counter()
+            response = call()
+            timings.append(time.perf_counter() - start)
+            sizes.append(len(response.content))
+        statements = metrics.totals()["statements"] - statements_before
+
+        # tracemalloc slows everything down, so memory gets its own few calls
+        tracemalloc.start()
+        peaks = []
+        for _ in range(min(n, 5)):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            call()
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        tracemalloc.stop()
+
+        timings.sort()
+        results[name] = {
+            "requests": n,
+            "first_ms": round(first * 1000, 3),
+            "p50_ms": round(_percentile(timings, 0.50) * 1000, 3),
+            "p95_ms": round(_percentile(timings, 0.95) * 1000, 3),
+            "mean_ms": round(sum(timings) / n * 1000, 3),
+            "statements_per_request": round(statements / n, 2),
+            "response_bytes": round(sum(sizes) / n),
+            "peak_alloc_kb": round(max(peaks) / 1024, 1),
+        }
+        print(f"  {name:<28} p50 {results[name]['p50_ms']:>8.2f} ms  p95 {results[name]['p95_ms']:>8.2f} ms  "
+              f"{results[name]['statements_per_request']:>5} stmts  {results[name]['peak_alloc_kb']:>9.1f} KB",
+              file=sys.stderr)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, n: int, seed: int, out: str):
+    """Benchmark each dataset size in its own process (the engine is bound at import) and write JSON."""
+    from synthetic_data import ensure_dataset
+
+    runs = []
+    for meals in sizes:
+        print(f"{meals} meals", file=sys.stderr)
+        path = ensure_dataset(meals, seed)
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+            result_path = tmp.name
+        try:
+            subprocess.run([sys.executable, __file__, "endpoints", "--db", path, "--n", str(n),
+                            "--seed", str(seed), "--out", result_path], check=True)
+            with open(result_path) as f:
+                runs.append(json.load(f))
+        finally:
+            os.unlink(result_path)
+    report = {
+        "commit": _git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "runs": runs,
+    }
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {out}", file=sys.stderr)
+
+
+def compare(before_path: str, after_path: str, threshold: float = 0.10):
+    """Print p50/p95 changes between two suite results, flagging slowdowns beyond threshold."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before.get('commit')} -> {after.get('commit')}")
+    old_runs = {run["dataset"]["meals"]: run for run in before["runs"]}
+    for run in after["runs"]:
+        meals = run["dataset"]["meals"]
+        if meals not in old_runs:
+            continue
+        print(f"{meals} meals")
+        for name, new in run["endpoints"].items():
+            old = old_runs[meals]["endpoints"].get(name)
+            if old is None:
+                continue
+            changes = []
+            for key in ("p50_ms", "p95_ms"):
+                ratio = new[key] / old[key] if old[key] else 1.0
+                flag = "  REGRESSION" if ratio > 1 + threshold else ""
+                changes.append(f"{key[:3]} {old[key]:.2f} -> {new[key]:.2f} ms ({ratio - 1:+.0%}){flag}")
+            print(f"  {name:<28} " + "   ".join(changes))
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmark", choices=["create", "load", "serialize", "match", "suite", "endpoints", "compare"])
+    parser.add_argument("files", nargs="*", help="compare: the before and after result files")
+    parser.add_argument("--n", type=int, default=300, help="requests (suite: per endpoint, default 50)")
+    parser.add_argument("--seed-meals", type=int, default=2000, help="meals imported before the load benchmark")
+    parser.add_argument("--path", default="/meals/?limit=50", help="endpoint hit by the load benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="suite: dataset sizes")
+    parser.add_argument("--db", help="endpoints: the dataset to copy and benchmark")
+    parser.add_argument("--out", default="benchmark-results.json", help="suite / endpoints: where to write JSON")
+    args = parser.parse_args()
+
+    if args.benchmark == "compare":
+        compare(*args.files)
+        return
+    if args.benchmark == "suite":
+        run_suite(args.sizes, args.n if args.n != parser.get_default("n") else 50, args.seed, args.out)
+        return
+
+    # Point the app at a scratch database (a copy, for endpoints) before db_config is imported
+    scratch = f"{tempfile.mkdtemp()}/benchmark.db"
+    if args.benchmark == "endpoints":
+        shutil.copyfile(args.db, scratch)
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch}"
+    from fastapi.testclient import TestClient
+    from main import app
+
+    if args.benchmark == "create":
+        bench_create(TestClient(app), args.n, args.seed)
+    elif args.benchmark == "load":
+        asyncio.run(_load(app, args.path, args.n, args.seed_meals, args.seed))
+    elif args.benchmark == "serialize":
+        with TestClient(app) as client:
+            bench_serialize(client, args.seed_meals, args.seed)
+    elif args.benchmark == "match":
+        with TestClient(app) as client:
+            bench_match(client, args.seed_meals, args.seed, args.n)
+    elif args.benchmark == "endpoints":
+        from sqlalchemy import text
+        from db_config import engine
+
+        with engine.connect() as conn:
+            meals, logs = conn.execute(text("SELECT (SELECT count(*) FROM Meals), (SELECT count(*) FROM LogEntries)")).one()
+        with TestClient(app) as client:
+            endpoints = bench_endpoints(client, meals, args.n, args.seed)
+        result = {
+            "dataset": {"path": args.db, "meals": meals, "log_entries": logs},
+            "endpoints": endpoints,
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,163 @@
+"""Bulk import and export of meals as newline-delimited JSON (one MealCreate per line).
+
+Imports are written in batches: each batch is one transaction of executemany-style
+Core inserts (meals, new ingredients, associations, directions, log entries), with
+ingredient names resolved to canonical ingredients in a single IN query. Exports page through Meals by
+meal_id so memory stays flat however large the table is.
+"""
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import Meal, Direction, LogEntry, meal_ingredients_association_table
+from schemas import MealCreate
+from meal_loader import load_children
+from ingredients import resolve_ingredients
+import meal_stats
+import search
+
+
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+MEAL_FIELDS = ("name", "description", "cuisine_type", "cooking_mode", "cooking_ease",
+               "cooking_time", "image_path", "source_url")
+
+
+def insert_meals(db: Session, meals: list[MealCreate]) -> list[int]:
+    """Insert meals and all their children without committing. Returns the new meal_ids in order."""
+    if not meals:
+        return []
+    rows = [{field: getattr(m, field) for field in MEAL_FIELDS} for m in meals]
+    # RETURNING with many rows is one INSERT per row on SQLite. The first row takes the
+    # write lock and gets max(meal_id) + 1; the rest follow it as one plain executemany.
+    first_id = db.execute(insert(Meal).returning(Meal.meal_id), rows[0]).scalar_one()
+    meal_ids = list(range(first_id, first_id + len(meals)))
+    if len(rows) > 1:
+        db.execute(insert(Meal), [dict(row, meal_id=meal_id) for meal_id, row in zip(meal_ids[1:], rows[1:])])
+    ingredient_ids = resolve_ingredients(db, [ing for m in meals for ing in m.ingredients or []])
+
+    associations, directions, log_entries, documents = [], [], [], []
+    for meal_id, meal in zip(meal_ids, meals):
+        amounts = {}
+        for ing in meal.ingredients or []:
+            amounts.setdefault(ingredient_ids[ing.name], (ing.quantity, ing.unit))
+        associations.extend(
+            {"meal_id": meal_id, "ingredient_id": ingredient_id, "quantity": quantity, "unit": unit}
+            for ingredient_id, (quantity, unit) in amounts.items()
+        )
+        steps = {}
+        for d in meal.directions or []:
+            steps.setdefault(d.step_number, {"meal_id": meal_id, "step_number": d.step_number, "description": d.description})
+        directions.extend(steps.values())
+        log_entries.extend(
+            {"meal_id": meal_id, "date": e.date, "rating": e.rating, "notes": e.notes}
+            for e in meal.log_entries or []
+        )
+        documents.append({
+            "meal_id": meal_id,
+            "name": meal.name,
+            "description": meal.description,
+            "ingredients": [ing.name for ing in meal.ingredients or []],
+            "directions": [d["description"] for d in sorted(steps.values(), key=lambda d: d["step_number"])],
+        })
+
+    if associations:
+        db.execute(insert(meal_ingredients_association_table), associations)
+    if directions:
+        db.execute(insert(Direction), directions)
+    if log_entries:
+        db.execute(insert(LogEntry), log_entries)
+        meal_stats.add_log_rows(db, log_entries)
+    # The rows are all new, so the stats and search index are fed from memory rather than re-read
+    search.add_documents(db, documents)
+    return meal_ids
+
+
+async def iter_lines(stream):
+    """Split an async byte stream (e.g. request.stream()) into lines without buffering the body."""
+    pending = b""
+    async for chunk in stream:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+class MealImporter:
+    """Validates NDJSON lines and inserts them, committing every BATCH_SIZE meals.
+
+    Lines that fail validation are skipped and reported with their 1-based line number.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.imported = 0
+        self.errors = []
+        self._batch = []
+        self._line_number = 0
+
+    async def add_line(self, line):
+        self._line_number += 1
+        if not line.strip():
+            return
+        try:
+            self._batch.append(MealCreate.model_validate_json(line))
+        except ValidationError as exc:
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append({
+                    "line": self._line_number,
+                    "detail": exc.errors(include_url=False, include_context=False, include_input=False),
+                })
+            return
+        if len(self._batch) >= BATCH_SIZE:
+            await self._flush()
+
+    async def _flush(self):
+        self.imported += len(await self.db.run_sync(insert_meals, self._batch))
+        await self.db.commit()
+        self._batch = []
+
+    async def finish(self) -> dict:
+        if self._batch:
+            await self._flush()
+        return {"imported": self.imported, "errors": self.errors}
+
+
+def export_page(db: Session, after_id: int = 0, page_size: int = BATCH_SIZE):
+    """NDJSON lines for the next page of meals after after_id, plus the cursor for the page after.
+
+    The cursor is None once every meal has been returned.
+    """
+    meals = db.execute(
+        select(Meal.meal_id, *(getattr(Meal, f) for f in MEAL_FIELDS))
+        .where(Meal.meal_id > after_id)
+        .order_by(Meal.meal_id)
+        .limit(page_size)
+    ).all()
+    if not meals:
+        return [], None
+    meal_ids = [m.meal_id for m in meals]
+    ingredients, directions, log_entries = load_children(db, meal_ids)
+    lines = []
+    for m in meals:
+        record = {field: getattr(m, field) for field in MEAL_FIELDS}
+        record["ingredients"] = ingredients.get(m.meal_id, [])
+        record["directions"] = directions.get(m.meal_id, [])
+        record["log_entries"] = log_entries.get(m.meal_id, [])
+        lines.append(json.dumps(record, default=str) + "\n")   # dates as YYYY-MM-DD
+    return lines, meal_ids[-1]
+
+
+async def export_lines(db: AsyncSession):
+    """Yield every meal with its children as NDJSON lines, one keyset page at a time."""
+    after_id = 0
+    while after_id is not None:
+        lines, after_id = await db.run_sync(export_page, after_id)
+        for line in lines:
+            yield line
@@ -0,0 +1,205 @@
+"""In-process caches invalidated by a global data version.
+
+Every write path that changes meals or log entries calls data_version.bump() after
+its commit, passing the meal_ids it touched when it knows them. Cached values
+remember the version they were computed at and are recomputed the next time they
+are read under a newer version.
+
+With several worker processes (serve.py), DATA_VERSION_FILE names a change log
+they share: each bump appends "<version> <meal ids or *>" under an exclusive lock,
+and every read of the version first checks the file's size (one stat) and applies
+any lines other workers appended. Versions are then numbered across processes, so
+each worker's caches and ETags move with writes made by any of them.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+
+DATA_VERSION_FILE = os.environ.get("DATA_VERSION_FILE")
+# Past this the log is rewritten as one "<version> *" line, which invalidates every cache once
+DATA_VERSION_FILE_MAX_BYTES = 1_000_000
+
+
+class DataVersion:
+    """Monotonic counter of committed meal/log writes.
+
+    Writes that name the meals they touched also stamp those meals, so a single
+    meal's version only moves when that meal (or everything, via a bare bump) changed.
+    """
+
+    def __init__(self, path: str = None):
+        self._value = 0
+        self._everything = 0
+        self._meals = {}
+        self._lock = threading.Lock()
+        self._path = path
+        self._inode = None      # of the log file read so far; a new one means it was compacted
+        self._offset = 0
+
+    @property
+    def value(self) -> int:
+        if self._path:
+            with self._lock:
+                self._sync()
+        return self._value
+
+    def bump(self, meal_ids=None) -> int:
+        with self._lock:
+            if self._path:
+                return self._append(meal_ids)
+            self._value += 1
+            self._apply(self._value, meal_ids)
+            return self._value
+
+    def meal_version(self, meal_id: int) -> int:
+        if self._path:
+            with self._lock:
+                self._sync()
+        return max(self._everything, self._meals.get(meal_id, 0))
+
+    def changed_since(self, version: int):
+        """Ids of the meals written after version, or None if a write that may have
+        touched any meal came after it."""
+        with self._lock:
+            if self._path:
+                self._sync()
+            if self._everything > version:
+                return None
+            return {meal_id for meal_id, v in self._meals.items() if v > version}
+
+    def _apply(self, version: int, meal_ids):
+        self._value = version
+        if meal_ids is None:
+            self._everything = version
+        else:
+            for meal_id in meal_ids:
+                self._meals[meal_id] = version
+
+    def _sync(self):
+        """Apply the lines other processes appended since the last read. Call with the lock held."""
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self._inode:
+            self._inode, self._offset = st.st_ino, 0
+        if st.st_size == self._offset:
+            return
+        with open(self._path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # A line still being written has no newline yet; it is read next time
+        complete = data[:data.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        for line in complete.decode().splitlines():
+            version, meal_ids = line.split(" ", 1)
+            if int(version) > self._value:
+                self._apply(int(version), None if meal_ids == "*" else [int(m) for m in meal_ids.split(",") if m])
+
+    def _append(self, meal_ids) -> int:
+        import fcntl    # Unix only; the shared file is only used by the multi-worker server
+
+        while True:
+            fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            # A writer that held the lock before us may have compacted the file into a new one
+            try:
+                if os.fstat(fd).st_ino == os.stat(self._path).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+        try:
+            self._sync()
+            version = self._value + 1
+            ids = "*" if meal_ids is None else ",".join(str(m) for m in meal_ids)
+            os.write(fd, f"{version} {ids}\n".encode())
+            self._apply(version, meal_ids)
+            self._offset += len(f"{version} {ids}\n")
+            if self._offset > DATA_VERSION_FILE_MAX_BYTES:
+                tmp = f"{self._path}.{os.getpid()}"
+                with open(tmp, "w") as f:
+                    f.write(f"{version} *\n")
+                os.replace(tmp, self._path)
+            return version
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+data_version = DataVersion(DATA_VERSION_FILE)
+
+
+class VersionedValue:
+    """A single cached value, valid until the data version moves."""
+
+    def __init__(self):
+        self._version = None
+        self._value = None
+
+    def get(self, compute):
+        # Read the version before computing: a write landing mid-compute leaves the
+        # value tagged stale, so the next read recomputes it.
+        version = data_version.value
+        if self._version != version:
+            self._value = compute()
+            self._version = version
+        return self._value
+
+    def clear(self):
+        self._version = None
+        self._value = None
+
+
+class VersionedCache:
+    """Cached values by key, all dropped when the data version moves.
+
+    For results that depend on request parameters. At most max_size keys are kept;
+    past that the oldest entry is evicted.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._version = None
+        self._values = {}
+
+    def get(self, key, compute):
+        version = data_version.value
+        if self._version != version:
+            self._values = {}
+            self._version = version
+        values = self._values
+        if key not in values:
+            value = compute()
+            if len(values) >= self.max_size:
+                values.pop(next(iter(values)))
+            values[key] = value
+        return values[key]
+
+
+class MealCache:
+    """Values about one meal each, least recently used evicted past max_size.
+
+    An entry remembers the meal's version when it was computed and is ignored once
+    that meal is written again (update, delete, image upload) or a bare bump moves
+    every meal, so no write path has to clear it. The caller computes (often
+    asynchronously) and puts; read the version before computing, as VersionedValue does.
+    """
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self._entries = OrderedDict()   # key -> (meal version, value)
+
+    def get(self, key, meal_id: int):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != data_version.meal_version(meal_id):
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, version: int, value):
+        self._entries[key] = (version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
@@ -0,0 +1,97 @@
+"""Dashboard numbers, computed once per data version and shared by the HTML and JSON views."""
+from collections import Counter
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from cache import VersionedValue
+
+
+dashboard_cache = VersionedValue()
+
+
+def _breakdown(counter: Counter):
+    return [{"label": label, "count": count} for label, count in counter.most_common() if label]
+
+
+def build_dashboard_data(db: Session) -> dict:
+    # Meal totals and the cuisine/mode/ease breakdowns in one pass over Meals
+    cuisine_counts, mode_counts, ease_counts = Counter(), Counter(), Counter()
+    total_meals = 0
+    for r in db.execute(text("""
+        SELECT cuisine_type, cooking_mode, cooking_ease, count(*) count
+        FROM Meals
+        GROUP BY cuisine_type, cooking_mode, cooking_ease
+    """)):
+        total_meals += r.count
+        cuisine_counts[r.cuisine_type] += r.count
+        mode_counts[r.cooking_mode] += r.count
+        ease_counts[r.cooking_ease] += r.count
+
+    total_log_entries = db.execute(text("SELECT count(*) FROM LogEntries")).scalar()
+
+    # Aggregate stats, rolled up from the per-meal summaries
+    agg_stats = db.execute(text("""
+        SELECT
+            count(*) meals_logged,
+            CAST(sum(rating_sum) AS REAL) / nullif(sum(rating_count), 0) avg_rating,
+            min(first_meal_date) first_log_date,
+            max(recent_meal_date) latest_log_date
+        FROM MealStats
+    """)).first()
+
+    # Most cooked meals (top 5)
+    most_cooked = db.execute(text("""
+        SELECT m.meal_id, m.name, s.meal_count times_cooked, CAST(s.rating_sum AS REAL) / nullif(s.rating_count, 0) avg_rating
+        FROM MealStats s
+        JOIN Meals m ON m.meal_id = s.meal_id
+        ORDER BY times_cooked DESC
+        LIMIT 5
+    """)).all()
+
+    # Recently logged meals (last 10)
+    recent_logs = db.execute(text("""
+        SELECT l.date, l.rating, l.notes, m.meal_id, m.name
+        FROM LogEntries l
+        JOIN Meals m ON m.meal_id = l.meal_id
+        ORDER BY l.date DESC
+        LIMIT 10
+    """)).all()
+
+    # Recently added meals (last 5)
+    recent_meals = db.execute(text("""
+        SELECT meal_id, name, cuisine_type
+        FROM Meals
+        ORDER BY meal_id DESC
+        LIMIT 5
+    """)).all()
+
+    return {
+        "total_meals": total_meals,
+        "total_log_entries": total_log_entries,
+        "meals_logged": (agg_stats.meals_logged or 0) if agg_stats else 0,
+        "avg_rating": round(agg_stats.avg_rating, 1) if agg_stats and agg_stats.avg_rating else 0,
+        "first_log_date": (agg_stats.first_log_date or "N/A") if agg_stats else "N/A",
+        "latest_log_date": (agg_stats.latest_log_date or "N/A") if agg_stats else "N/A",
+        "cuisine_breakdown": _breakdown(cuisine_counts),
+        "mode_breakdown": _breakdown(mode_counts),
+        "ease_breakdown": _breakdown(ease_counts),
+        "most_cooked": [
+            {"meal_id": r.meal_id, "name": r.name, "times_cooked": r.times_cooked,
+             "avg_rating": round(r.avg_rating, 1) if r.avg_rating else "N/A"}
+            for r in most_cooked
+        ],
+        "recent_logs": [
+            {"date": r.date, "rating": r.rating, "notes": r.notes,
+             "meal_id": r.meal_id, "name": r.name}
+            for r in recent_logs
+        ],
+        "recent_meals": [
+            {"meal_id": m.meal_id, "name": m.name, "cuisine_type": m.cuisine_type or ""}
+            for m in recent_meals
+        ],
+    }
+
+
+def get_dashboard_data(db: Session) -> dict:
+    return dashboard_cache.get(lambda: build_dashboard_data(db))
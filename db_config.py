@@ -1,16 +1,101 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, Session
 from models import Base
+from search import create_search_index
+from meal_stats import ensure_meal_stats
+from ingredients import ensure_canonical_ingredients
+from log_dates import ensure_log_dates
+import metrics
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///data/meal_tracker.db")
+# The routes use aiosqlite so queries run off the event loop; scripts and startup use the sync driver
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+# PRAGMAs applied to every new SQLite connection. Pick one with DB_PROFILE.
+# WAL lets readers keep going while a write is in progress, and busy_timeout makes a
+# second writer wait for the lock instead of failing with "database is locked".
+ENGINE_PROFILES = {
+    "default": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",    # Safe with WAL; only the last commits can be lost on power failure
+        "busy_timeout": 5000,       # ms
+        "cache_size": -32000,       # KiB (negative) = 32 MB page cache
+        "mmap_size": 134217728,     # 128 MB
+        "temp_store": "MEMORY",
+    },
+    # For small boards where RAM matters more than read speed
+    "low_memory": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -4000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    # Every commit fsynced; slowest writes, nothing lost on power failure
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "cache_size": -32000,
+        "mmap_size": 134217728,
+        "temp_store": "MEMORY",
+    },
+}
+DB_PROFILE = os.environ.get("DB_PROFILE", "default")
 
-DATABASE_URL = "sqlite:///data/meal_tracker.db"
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-Base.metadata.create_all(bind=engine)
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma, value in ENGINE_PROFILES[DB_PROFILE].items():
+        cursor.execute(f"PRAGMA {pragma} = {value}")
+    cursor.close()
+
+
+event.listen(engine, "connect", _apply_pragmas)
+event.listen(async_engine.sync_engine, "connect", _apply_pragmas)
+metrics.instrument(engine)
+metrics.instrument(async_engine.sync_engine)
+
+
+def add_missing_columns(engine):
+    """create_all never alters existing tables, so add nullable columns declared on the models since."""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table.name}")')}
+            if not existing:
+                continue
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+
+
+def create_indexes(engine):
+    """create_all only indexes tables it creates, so add indexes declared since to existing tables."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+# serve.py runs these once and sets STARTUP_CHECKS_DONE for its workers, so they don't race each other
+if not os.environ.get("STARTUP_CHECKS_DONE"):
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    create_indexes(engine)
+    ensure_canonical_ingredients(engine)
+    create_search_index(engine)
+    ensure_log_dates(engine)
+    ensure_meal_stats(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
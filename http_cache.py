@@ -0,0 +1,139 @@
+"""HTTP caching: ETags and 304s for API and page responses, Cache-Control and gzip.
+
+ETags come from the in-process data version (cache.py), so checking If-None-Match
+costs a dict lookup and never opens a database connection. List endpoints are tagged
+with the global version; single-meal pages with the version at which that meal last
+changed. Every tag also carries an id for this process, so a restart (new code,
+templates or database) never matches tags handed out before it. serve.py gives its
+workers one id through BOOT_ID, so their tags agree with each other.
+
+Routes opt in with a dependency:
+
+    @app.get("/meals/", dependencies=[Depends(http_cache.list_etag)])
+"""
+import os
+import re
+import uuid
+from datetime import date
+
+from fastapi import Request
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import Response
+
+from cache import data_version
+
+
+BOOT_ID = os.environ.get("BOOT_ID") or uuid.uuid4().hex[:8]
+# Browsers may keep the response but must ask again; the answer is usually a bodiless 304
+REVALIDATE = "no-cache"
+IMMUTABLE = "public, max-age=31536000, immutable"
+ASSET_MAX_AGE = "public, max-age=86400"
+
+_CONTENT_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+def make_etag(version) -> str:
+    # Weak: the gzip middleware changes the bytes but not the meaning
+    return f'W/"{BOOT_ID}-{version}"'
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def _check(request: Request, version):
+    etag = make_etag(version)
+    if request.method in ("GET", "HEAD") and _matches(request, etag):
+        raise NotModified(etag)
+    request.state.etag = etag
+
+
+async def list_etag(request: Request):
+    """For responses built from many meals: any committed write changes the tag."""
+    _check(request, data_version.value)
+
+
+async def daily_etag(request: Request):
+    """For responses that also depend on today's date, such as recency scores."""
+    _check(request, f"{data_version.value}.{date.today().isoformat()}")
+
+
+async def meal_etag(meal_id: int, request: Request):
+    """For responses about one meal: only writes touching that meal change the tag."""
+    _check(request, f"m{meal_id}.{data_version.meal_version(meal_id)}")
+
+
+async def page_etag(request: Request):
+    """For pages rendered from templates alone; they only change with a restart."""
+    _check(request, "page")
+
+
+def not_modified_response(request: Request, exc: NotModified) -> Response:
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": REVALIDATE})
+
+
+class ETagMiddleware:
+    """Adds the ETag chosen by the route's dependency to successful responses."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                etag = scope.get("state", {}).get("etag")
+                if etag:
+                    headers = MutableHeaders(scope=message)
+                    headers["ETag"] = etag
+                    headers.setdefault("Cache-Control", REVALIDATE)
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+
+class CompressionMiddleware:
+    """gzip for JSON and HTML; images under /assets are already compressed and go out as is."""
+
+    def __init__(self, app, minimum_size: int = 1000, skip_prefixes=("/assets/",)):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=6)
+        self.skip_prefixes = skip_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(self.skip_prefixes):
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles (which already answers If-None-Match / If-Modified-Since) plus Cache-Control.
+
+    Files named by their content hash (see images.py) can never change, so they are
+    cached for a year; everything else uses default_cache_control.
+    """
+
+    def __init__(self, *args, default_cache_control: str = REVALIDATE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_cache_control = default_cache_control
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        stem = str(full_path).rsplit("/", 1)[-1].split(".", 1)[0]
+        response.headers["Cache-Control"] = IMMUTABLE if _CONTENT_HASH_RE.match(stem) else self.default_cache_control
+        return response
@@ -0,0 +1,179 @@
+"""Uploaded meal images: content-addressed storage and resized variants.
+
+Uploads are copied to disk in chunks on a worker thread while being hashed, and
+stored as assets/images/<sha256><ext>, so uploading the same picture twice keeps one
+file. The thumbnail and card sizes are rendered by a small thread pool after the
+upload has been answered (Pillow releases the GIL while decoding and resizing) and
+recorded on the Image row, so list pages can serve a few KB instead of the original.
+
+Run `python images.py` to hash and render variants for images stored before this.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image as PILImage, ImageOps, UnidentifiedImageError
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from models import Meal, Image
+
+
+IMAGE_DIR = "assets/images"
+CHUNK_SIZE = 1024 * 1024
+# Bounding boxes in pixels; the aspect ratio is kept
+VARIANTS = {
+    "thumb": (160, 160),
+    "card": (640, 640),
+}
+JPEG_QUALITY = 82
+ALLOWED_SUFFIXES = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic"}
+
+log = logging.getLogger("meals.images")
+_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("IMAGE_WORKERS", 2)), thread_name_prefix="images")
+
+
+def store_file(fileobj, filename: str):
+    """Copy fileobj into IMAGE_DIR under its content hash. Blocking; run it off the event loop.
+
+    Returns (sha256 hex digest, stored path).
+    """
+    os.makedirs(IMAGE_DIR, exist_ok=True)
+    suffix = os.path.splitext(filename or "")[1].lower()
+    if suffix not in ALLOWED_SUFFIXES:
+        suffix = ".jpg"
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=IMAGE_DIR, suffix=".part", delete=False) as tmp:
+        try:
+            while chunk := fileobj.read(CHUNK_SIZE):
+                digest.update(chunk)
+                tmp.write(chunk)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+    path = f"{IMAGE_DIR}/{digest.hexdigest()}{suffix}"
+    if os.path.exists(path):
+        os.unlink(tmp.name)
+    else:
+        os.replace(tmp.name, path)
+    return digest.hexdigest(), path
+
+
+def variant_path(name: str, content_hash: str) -> str:
+    return f"{IMAGE_DIR}/{name}/{content_hash}.jpg"
+
+
+def render_variants(path: str, content_hash: str) -> dict[str, str]:
+    """Write every VARIANTS size of the image at path. Returns {"thumb_path": ..., "card_path": ...}.
+
+    Variants already on disk (the same picture uploaded earlier) are not rendered again.
+    Raises PIL.UnidentifiedImageError when path is not an image.
+    """
+    targets = {name: variant_path(name, content_hash) for name in VARIANTS}
+    missing = {name: target for name, target in targets.items() if not os.path.exists(target)}
+    if missing:
+        with PILImage.open(path) as source:
+            # Phone photos are stored sideways with an EXIF rotation flag
+            picture = ImageOps.exif_transpose(source).convert("RGB")
+        for name, target in missing.items():
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            resized = picture.copy()
+            resized.thumbnail(VARIANTS[name], PILImage.Resampling.LANCZOS)
+            tmp = f"{target}.part"
+            resized.save(tmp, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            os.replace(tmp, target)
+    return {f"{name}_path": target for name, target in targets.items()}
+
+
+async def save_upload(upload) -> tuple[str, str]:
+    """Store a FastAPI UploadFile without blocking the event loop. Returns (content hash, path)."""
+    return await asyncio.to_thread(store_file, upload.file, upload.filename)
+
+
+async def render_in_background(meal_id: int, image_id: int, path: str, content_hash: str):
+    """Render the variants on the image pool, then record them on the Image row."""
+    from db_config import AsyncSessionLocal
+    from cache import data_version
+
+    loop = asyncio.get_running_loop()
+    try:
+        variants = await loop.run_in_executor(_pool, render_variants, path, content_hash)
+    except (UnidentifiedImageError, OSError) as exc:
+        log.warning("Could not render variants for image %s: %s", image_id, exc)
+        return
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Image).where(Image.image_id == image_id).values(**variants))
+        await db.commit()
+    data_version.bump([meal_id])
+
+
+def known_variants(db: Session, content_hash: str):
+    """Variant paths of an earlier upload of the same picture, or None if it has none yet."""
+    row = db.execute(
+        select(Image.thumb_path, Image.card_path)
+        .where(Image.content_hash == content_hash, Image.card_path.is_not(None))
+        .limit(1)
+    ).first()
+    return row._asdict() if row else None
+
+
+def card_images(db: Session, image_paths) -> dict[str, str]:
+    """Map Meal.image_path (a file name under IMAGE_DIR) -> the card variant's path under IMAGE_DIR."""
+    by_path = {f"{IMAGE_DIR}/{p}": p for p in image_paths if p}
+    if not by_path:
+        return {}
+    rows = db.execute(
+        select(Image.path, Image.card_path).where(Image.path.in_(list(by_path)), Image.card_path.is_not(None))
+    )
+    return {by_path[r.path]: r.card_path.removeprefix(f"{IMAGE_DIR}/") for r in rows}
+
+
+def shutdown():
+    _pool.shutdown(wait=True)
+
+
+def backfill(db: Session):
+    """Hash and render variants for stored images that predate the pipeline.
+
+    Meal images that were copied into IMAGE_DIR by hand get an Image row first.
+    Files keep their names, so existing image_path values stay valid.
+    """
+    registered = set(db.execute(select(Image.path)).scalars())
+    for meal_id, image_path in db.execute(select(Meal.meal_id, Meal.image_path).where(Meal.image_path.is_not(None))):
+        path = f"{IMAGE_DIR}/{image_path}"
+        if path not in registered and os.path.isfile(path):
+            db.add(Image(meal_id=meal_id, path=path))
+            registered.add(path)
+    db.flush()
+
+    done = 0
+    for image in db.execute(select(Image).where(Image.card_path.is_(None))).scalars():
+        if not os.path.isfile(image.path):
+            continue
+        with open(image.path, "rb") as f:
+            image.content_hash = hashlib.file_digest(f, "sha256").hexdigest()
+        try:
+            variants = render_variants(image.path, image.content_hash)
+        except UnidentifiedImageError:
+            print(f"skipping {image.path}: not an image")
+            continue
+        image.thumb_path = variants["thumb_path"]
+        image.card_path = variants["card_path"]
+        done += 1
+    return done
+
+
+if __name__ == '__main__':
+    from db_config import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count = backfill(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f'rendered variants for {count} images')
@@ -0,0 +1,207 @@
+"""Canonical ingredients, name normalization and the in-memory ingredient -> meals index.
+
+An Ingredients row is one canonical ingredient: "Garlic", " garlic" and "GARLIC" all
+have canonical_name "garlic", and "Tomatoes" becomes "tomato". The amount a recipe
+calls for lives on its Meal_Ingredients row, so two recipes sharing an ingredient
+no longer share a quantity.
+
+Run `python ingredients.py` to re-normalize every name and merge the duplicates;
+this also runs once on the first start after canonical_name was added.
+"""
+import re
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session
+
+from models import Ingredient, meal_ingredients_association_table
+from cache import data_version
+
+
+_WORD_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+# Words that end like plurals but aren't
+_INVARIANT = {"asparagus", "couscous", "hummus", "molasses", "swiss", "grits", "series", "species"}
+_IRREGULAR = {"leaves": "leaf", "halves": "half", "loaves": "loaf", "knives": "knife"}
+
+
+def _singular(word: str) -> str:
+    if word in _IRREGULAR:
+        return _IRREGULAR[word]
+    if len(word) <= 3 or word in _INVARIANT or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes", "zes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+@lru_cache(maxsize=4096)
+def normalize(name: str) -> str:
+    """Canonical form of an ingredient name: lower case, punctuation and extra spaces
+    dropped, last word singular ("Cherry  Tomatoes" -> "cherry tomato")."""
+    words = _WORD_RE.findall(name.lower())
+    if not words:
+        return name.strip().lower()
+    words[-1] = _singular(words[-1])
+    return " ".join(words)
+
+
+def resolve_ingredients(db: Session, ingredients) -> dict[str, int]:
+    """Map each ingredient's name -> canonical ingredient_id, inserting the ones that don't exist yet.
+
+    A new canonical ingredient is displayed with the first spelling seen for it.
+    """
+    display = {}
+    for ing in ingredients:
+        display.setdefault(normalize(ing.name), ing.name)
+    if not display:
+        return {}
+    ids = dict(db.execute(
+        select(Ingredient.canonical_name, Ingredient.ingredient_id)
+        .where(Ingredient.canonical_name.in_(list(display)))
+    ).all())
+    missing = [{"name": name, "canonical_name": canonical}
+               for canonical, name in display.items() if canonical not in ids]
+    if missing:
+        # One multi-row INSERT ... RETURNING; rows may come back in any order, so map by canonical_name
+        rows = db.execute(insert(Ingredient).returning(Ingredient.ingredient_id, Ingredient.canonical_name), missing)
+        ids.update((r.canonical_name, r.ingredient_id) for r in rows)
+    return {ing.name: ids[normalize(ing.name)] for ing in ingredients}
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table}")')}
+
+
+def _normalize_all(conn):
+    # Before this change the amount sat on the shared Ingredients row; give every recipe
+    # still linked to an unmigrated ingredient its own copy of it first.
+    if {"quantity", "unit"} <= _columns(conn, "Ingredients"):
+        conn.execute(text("""
+            UPDATE Meal_Ingredients
+            SET quantity = (SELECT i.quantity FROM Ingredients i WHERE i.ingredient_id = Meal_Ingredients.ingredient_id),
+                unit = (SELECT i.unit FROM Ingredients i WHERE i.ingredient_id = Meal_Ingredients.ingredient_id)
+            WHERE quantity IS NULL AND unit IS NULL
+              AND ingredient_id IN (SELECT ingredient_id FROM Ingredients WHERE canonical_name IS NULL)
+        """))
+
+    groups = defaultdict(list)
+    for ingredient_id, name in conn.execute(text("SELECT ingredient_id, name FROM Ingredients ORDER BY ingredient_id")):
+        groups[normalize(name or "")].append(ingredient_id)
+    merged = []
+    for ids in groups.values():
+        keep, *drop = ids
+        merged.extend({"keep": keep, "drop": d} for d in drop)
+    if merged:
+        conn.execute(text("UPDATE Meal_Ingredients SET ingredient_id = :keep WHERE ingredient_id = :drop"), merged)
+        conn.execute(text("DELETE FROM Ingredients WHERE ingredient_id = :drop"), merged)
+        # A recipe that listed both spellings keeps the first one
+        conn.execute(text("""
+            DELETE FROM Meal_Ingredients WHERE rowid NOT IN (
+                SELECT min(rowid) FROM Meal_Ingredients GROUP BY meal_id, ingredient_id
+            )
+        """))
+    conn.execute(
+        text("UPDATE Ingredients SET canonical_name = :canonical WHERE ingredient_id = :id"),
+        [{"canonical": canonical, "id": ids[0]} for canonical, ids in groups.items()],
+    )
+    return len(merged)
+
+
+def ensure_canonical_ingredients(engine):
+    """Normalize and merge ingredients on the first start after canonical_name was added."""
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT 1 FROM Ingredients WHERE canonical_name IS NULL LIMIT 1")).first():
+            _normalize_all(conn)
+
+
+class IngredientIndex:
+    """Canonical ingredient name -> ids of the meals that use it, kept in memory.
+
+    Built with one query on first use. After that each read folds in only the meals
+    written since (data_version knows which), re-reading their ingredient rows; a write
+    that didn't say which meals it touched (bulk import) triggers a full rebuild.
+    """
+
+    # Beyond this many changed meals one full scan is cheaper than an IN query
+    MAX_INCREMENTAL = 2000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._meals = {}
+        self._ingredients = {}
+
+    def _read(self, db: Session, meal_ids=None):
+        assoc = meal_ingredients_association_table
+        query = (
+            select(assoc.c.meal_id, Ingredient.canonical_name)
+            .join(Ingredient, Ingredient.ingredient_id == assoc.c.ingredient_id)
+        )
+        if meal_ids is not None:
+            query = query.where(assoc.c.meal_id.in_(meal_ids))
+        by_meal = defaultdict(set)
+        for meal_id, canonical_name in db.connection().execute(query):
+            by_meal[meal_id].add(canonical_name)
+        return by_meal
+
+    def refresh(self, db: Session):
+        # Queries run outside the lock (under run_sync they yield to the event loop);
+        # the result is only applied if no other refresh got there first.
+        start, target = self._version, data_version.value
+        if start == target:
+            return
+        changed = None if start is None else data_version.changed_since(start)
+        if changed is None or len(changed) > self.MAX_INCREMENTAL:
+            by_meal = self._read(db)
+            with self._lock:
+                if self._version != start:
+                    return
+                self._ingredients = dict(by_meal)
+                meals = defaultdict(set)
+                for meal_id, names in by_meal.items():
+                    for name in names:
+                        meals[name].add(meal_id)
+                self._meals = dict(meals)
+                self._version = target
+            return
+
+        by_meal = self._read(db, list(changed)) if changed else {}
+        with self._lock:
+            if self._version != start:
+                return
+            for meal_id in changed:
+                for name in self._ingredients.pop(meal_id, ()):
+                    meal_ids = self._meals[name]
+                    meal_ids.discard(meal_id)
+                    if not meal_ids:
+                        del self._meals[name]
+            for meal_id, names in by_meal.items():
+                self._ingredients[meal_id] = names
+                for name in names:
+                    self._meals.setdefault(name, set()).add(meal_id)
+            self._version = target
+
+    def meals_with_all(self, db: Session, names) -> set[int]:
+        """Ids of the meals that use every one of the named ingredients (any spelling)."""
+        self.refresh(db)
+        sets = sorted((self._meals.get(normalize(n), set()) for n in names), key=len)
+        if not sets:
+            return set()
+        return sets[0].intersection(*sets[1:])
+
+
+ingredient_index = IngredientIndex()
+
+
+if __name__ == '__main__':
+    from db_config import engine
+
+    with engine.begin() as conn:
+        count = _normalize_all(conn)
+    print(f'ingredients normalized, {count} duplicates merged')
@@ -0,0 +1,90 @@
+"""LogEntries.date as a real date: parsing the free-text values stored before it was one.
+
+The column used to be Text and each writer put in whatever it had. SQLAlchemy's
+Date stores ISO "YYYY-MM-DD", which sorts, compares and indexes correctly; a value
+in any other shape breaks ORDER BY date and min/max, and can't be read back as a date.
+
+Run `python log_dates.py` to rewrite every non-ISO date in data/meal_tracker.db; this
+also runs on startup whenever one is found. A value that no known format matches is
+set to NULL and kept at the end of the entry's notes.
+"""
+import logging
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+log = logging.getLogger("meals.log_dates")
+
+
+# Tried in order after ISO 8601 (strptime also takes unpadded "2026-1-7"); month-first
+# wins for ambiguous slashed dates, as the UI showed them that way
+FORMATS = (
+    "%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%Y/%m/%d", "%m-%d-%Y", "%Y.%m.%d",
+    "%B %d, %Y", "%b %d, %Y", "%B %d %Y", "%b %d %Y", "%d %B %Y", "%d %b %Y",
+)
+
+# Rows whose date is not already a canonical ISO date (SQLite's date() returns it unchanged)
+_NOT_ISO = "date IS NOT NULL AND (typeof(date) != 'text' OR date(date) IS NOT date)"
+
+
+def parse_date(value):
+    """A date from a date, datetime or string in ISO 8601 or one of FORMATS, else None."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    s = str(value).strip()
+    if not s:
+        return None
+    try:
+        return datetime.fromisoformat(s).date()
+    except ValueError:
+        pass
+    for fmt in FORMATS:
+        try:
+            return datetime.strptime(s, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _normalize_all(conn):
+    """Rewrite the non-ISO dates. Returns (rewritten, unrecognized) counts."""
+    fixed, unrecognized = [], []
+    for log_entry_id, value, notes in conn.execute(text(f"SELECT log_entry_id, date, notes FROM LogEntries WHERE {_NOT_ISO}")):
+        parsed = parse_date(value)
+        if parsed is not None:
+            fixed.append({"id": log_entry_id, "date": parsed.isoformat()})
+        else:
+            note = f"(logged date: {value})"
+            unrecognized.append({"id": log_entry_id, "notes": f"{notes} {note}" if notes else note})
+    if fixed:
+        conn.execute(text("UPDATE LogEntries SET date = :date WHERE log_entry_id = :id"), fixed)
+    if unrecognized:
+        conn.execute(text("UPDATE LogEntries SET date = NULL, notes = :notes WHERE log_entry_id = :id"), unrecognized)
+    return len(fixed), len(unrecognized)
+
+
+def ensure_log_dates(engine):
+    """Normalize log dates on startup if any aren't ISO.
+
+    MealStats holds first/last dates copied from the log, so it is emptied for
+    ensure_meal_stats to rebuild; call this before that.
+    """
+    with engine.begin() as conn:
+        if conn.execute(text(f"SELECT 1 FROM LogEntries WHERE {_NOT_ISO} LIMIT 1")).first():
+            fixed, unrecognized = _normalize_all(conn)
+            conn.execute(text("DELETE FROM MealStats"))
+            log.warning("LogEntries: %d dates rewritten as ISO, %d unrecognized set to NULL", fixed, unrecognized)
+
+
+if __name__ == '__main__':
+    # Importing db_config runs ensure_log_dates (and the MealStats rebuild) against DATABASE_URL
+    from db_config import engine
+
+    with engine.connect() as conn:
+        total, missing = conn.execute(text("SELECT count(*), count(*) - count(date) FROM LogEntries")).one()
+        remaining = conn.execute(text(f"SELECT count(*) FROM LogEntries WHERE {_NOT_ISO}")).scalar()
+    print(f'{total} log entries: {total - missing - remaining} ISO dates, {missing} without a date, {remaining} left to fix')
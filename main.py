@@ -1,21 +1,45 @@
-from fastapi import FastAPI, HTTPException, Depends, Request, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, UploadFile, File, Form, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse, HTMLResponse
+from fastapi.responses import RedirectResponse, HTMLResponse, PlainTextResponse, StreamingResponse, ORJSONResponse
 from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session, joinedload, subqueryload
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, text, Table
-import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, text, Table, or_, select, update
+from datetime import date
 # Import models and schemas
-from models import Meal, Ingredient, Direction, LogEntry, Image
-from schemas import MealCreate, MealResponse, IngredientResponse, DirectionResponse, LogEntryResponse, MealStats
-from db_config import get_db
+from models import Meal, MealStat, Ingredient, Direction, LogEntry, Image, meal_ingredients_association_table
+from schemas import MealCreate, MealPatch, MealResponse, MealSummary, IngredientResponse, DirectionResponse, LogEntryResponse, MealStats, MealSearchResult, MealMatch, MealRecommendation, MealPlan, ShoppingItem, CookCount, RatingTrendPoint, CookingStreaks, NeglectedMeal
+from db_config import get_db, AsyncSessionLocal, async_engine
+import search
+import meal_stats
+from cache import data_version, MealCache
+from dashboard import get_dashboard_data
+import bulk
+import meal_updates
+import images
+from ingredients import ingredient_index
+import pantry
+import recommendations
+import planner
+import shopping
+import analytics
+import metrics
+import http_cache
+from meal_loader import MEAL_COLUMNS, SUMMARY_COLUMNS, load_meal_dicts, load_meal_page, load_meal_summaries
 import requests
-from typing import Optional
-import shutil
+from typing import Literal, Optional
+from contextlib import asynccontextmanager
 import os
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # aiosqlite runs each connection on its own thread; close them so the process can exit
+    images.shutdown()
+    await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,234 +48,289 @@ app.add_middleware(
     allow_methods=["*"],  # Allow all methods (GET, POST, etc.)
     allow_headers=["*"],  # Allow all headers
 )
+app.add_middleware(http_cache.ETagMiddleware)
+app.add_middleware(http_cache.CompressionMiddleware)
+# Last added runs outermost: it times everything, and sees the compressed body size
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_exception_handler(http_cache.NotModified, http_cache.not_modified_response)
 # Ensure the templates directory is correctly set relative to the main.py location
 templates = Jinja2Templates(directory="templates")
-app.mount("/static", StaticFiles(directory="static"), name="static")
-app.mount("/assets", StaticFiles(directory="assets"), name='images')
-
-def _fmt_date(date_str):
-    """Convert YYYY-MM-DD to MM/DD/YYYY for display. Passes through anything that doesn't match."""
-    if not date_str or date_str in ('N/A', 'never'):
-        return date_str
-    parts = str(date_str).split('-')
-    if len(parts) == 3:
-        return f"{parts[1]}/{parts[2]}/{parts[0]}"
-    return date_str
+# Rendered /meal/{meal_id} pages; url_for makes them depend on the host they were served under
+meal_pages = MealCache(max_size=int(os.environ.get("MEAL_PAGE_CACHE_SIZE", 512)))
+app.mount("/static", http_cache.CachedStaticFiles(directory="static"), name="static")
+app.mount("/assets", http_cache.CachedStaticFiles(directory="assets", default_cache_control=http_cache.ASSET_MAX_AGE), name='images')
+
+def _fmt_date(value):
+    """Show a date (or ISO date string) as MM/DD/YYYY. Passes through anything else, e.g. 'N/A'."""
+    if isinstance(value, str):
+        try:
+            value = date.fromisoformat(value)
+        except ValueError:
+            return value
+    return value.strftime("%m/%d/%Y") if isinstance(value, date) else value
 
 templates.env.filters["fmt_date"] = _fmt_date
 
 
 
-def get_meal_with_ingredients(meal_id: int, db: Session):
-    return db.query(Meal).options(joinedload(Meal.ingredients)).filter(Meal.meal_id == meal_id).first()
+async def get_meal_with_ingredients(meal_id: int, db: AsyncSession):
+    return (await db.execute(select(Meal).options(selectinload(Meal.ingredients)).filter(Meal.meal_id == meal_id))).scalars().first()
 
 
 
 #
 @app.get('/test/{meal_id}', response_model=MealResponse)
-async def test(meal_id: int, db: Session = Depends(get_db)):
-    a = text(f"SELECT * FROM Meals WHERE meal_id={meal_id}")
-    df = pd.DataFrame(db.execute(a))
-    print(df)
-    meals = db.query(Meal).filter(Meal.meal_id == meal_id).first()#db.query(Meal).first()
-    print(meals.__dict__)
+async def test(meal_id: int, db: AsyncSession = Depends(get_db)):
+    meals = (await db.execute(select(Meal).filter(Meal.meal_id == meal_id))).scalars().first()
     return MealResponse.model_validate(meals.__dict__)
 
 
 
 # Creates a new meal
 @app.post("/meals/", response_model=MealResponse)
-async def create_meal(meal: MealCreate, db: Session = Depends(get_db)):
-    db_meal = Meal(
-        name=meal.name,
-        description=meal.description,
-        cuisine_type=meal.cuisine_type,
-        cooking_mode=meal.cooking_mode,
-        cooking_ease=meal.cooking_ease,
-        cooking_time=meal.cooking_time,
-        image_path=meal.image_path,
-        source_url=meal.source_url,
+async def create_meal(meal: MealCreate, db: AsyncSession = Depends(get_db)):
+    # One transaction: the meal, its ingredients (resolved with a single IN query),
+    # directions and log entries are all batch-inserted and committed together
+    meal_id, = await db.run_sync(bulk.insert_meals, [meal])
+    await db.commit()
+    data_version.bump([meal_id])
+
+    return (await db.run_sync(load_meal_page, select(*MEAL_COLUMNS).where(Meal.meal_id == meal_id)))[0]
+
+
+# Imports meals from a streamed NDJSON body, one MealCreate object per line
+@app.post("/meals/bulk", response_model=dict)
+async def bulk_import_meals(request: Request, db: AsyncSession = Depends(get_db)):
+    importer = bulk.MealImporter(db)
+    try:
+        async for line in bulk.iter_lines(request.stream()):
+            await importer.add_line(line)
+        return await importer.finish()
+    finally:
+        if importer.imported:
+            data_version.bump()
+
+
+# Streams every meal with its ingredients, directions and log entries as NDJSON
+@app.get("/meals/export")
+async def export_meals():
+    async def stream():
+        async with AsyncSessionLocal() as db:
+            async for line in bulk.export_lines(db):
+                yield line
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": 'attachment; filename="meals.ndjson"'})
+
+
+# Full-text search over meal names, descriptions, ingredients and directions, best matches first
+@app.get("/meals/search", response_model=list[MealSearchResult], response_class=ORJSONResponse,
+         dependencies=[Depends(http_cache.list_etag)])
+async def search_meals(q: str, limit: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(get_db)):
+    rows = await db.run_sync(search.search_meals, q, limit)
+    return ORJSONResponse([
+        {
+            "meal_id": r.meal_id,
+            "name": r.name,
+            "description": r.description,
+            "cuisine_type": r.cuisine_type,
+            "cooking_mode": r.cooking_mode,
+            "cooking_ease": r.cooking_ease,
+            "cooking_time": r.cooking_time,
+            "image_path": r.image_path,
+            "score": -r.score,  # bm25() is lower-is-better
+            "snippet": r.snippet,
+        }
+        for r in rows
+    ])
+
+
+# Meals that use every ingredient listed in `have` (repeat it or separate names with commas).
+# Spelling, case and plurals don't matter: names are matched in canonical form.
+@app.get("/meals/by-ingredients", response_model=list[MealResponse], response_class=ORJSONResponse,
+         dependencies=[Depends(http_cache.list_etag)])
+async def meals_by_ingredients(
+    have: list[str] = Query(...),
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+):
+    names = [name for value in have for name in value.split(",") if name.strip()]
+    meal_ids = await db.run_sync(ingredient_index.meals_with_all, names)
+    page = sorted(i for i in meal_ids if after_id is None or i > after_id)[:limit]
+    query = select(*MEAL_COLUMNS).where(Meal.meal_id.in_(page)).order_by(Meal.meal_id)
+    return ORJSONResponse(await db.run_sync(load_meal_dicts, query))
+
+
+# Ranks meals by how much of their ingredient list is in `have` (the pantry): best coverage
+# first, then fewest missing ingredients. Optional limits on cooking time, mode and gaps.
+@app.get("/meals/match", response_model=list[MealMatch], response_class=ORJSONResponse,
+         dependencies=[Depends(http_cache.list_etag)])
+async def match_meals(
+    have: list[str] = Query(...),
+    max_time: Optional[int] = None,
+    cooking_mode: Optional[str] = None,
+    min_coverage: float = Query(0.0, ge=0.0, le=1.0),
+    max_missing: Optional[int] = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+):
+    names = [name for value in have for name in value.split(",") if name.strip()]
+    return ORJSONResponse(await db.run_sync(
+        pantry.match_meals, names, max_time, cooking_mode, min_coverage, max_missing, limit
+    ))
+
+
+# Suggests what to cook next from the cooking history: well rated, not had in a while,
+# a cuisine not eaten lately and ingredients like the meals cooked most. See recommendations.py.
+@app.get("/recommendations", response_model=list[MealRecommendation], response_class=ORJSONResponse,
+         dependencies=[Depends(http_cache.daily_etag)])
+async def get_recommendations(
+    cuisine_type: Optional[str] = None,
+    max_time: Optional[int] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    return ORJSONResponse(await db.run_sync(recommendations.recommend, limit, cuisine_type, max_time))
+
+
+# Plans a meal per day from start: no meal twice, no cuisine again within cuisine_gap days,
+# optional per-meal and total cooking time limits, preferring cooking_ease. See planner.py.
+@app.get("/plan", response_model=MealPlan, response_class=ORJSONResponse,
+         dependencies=[Depends(http_cache.daily_etag)])
+async def plan_meals(
+    start: Optional[date] = None,
+    days: int = Query(7, ge=1, le=28),
+    cuisine_gap: int = Query(2, ge=0, le=27),
+    max_time: Optional[int] = Query(None, ge=0),
+    max_total_time: Optional[int] = Query(None, ge=0),
+    cooking_ease: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    plan = await db.run_sync(
+        planner.plan_meals, start or date.today(), days, cuisine_gap, max_time, max_total_time, cooking_ease
     )
-    db.add(db_meal)
-    db.commit()
-    db.refresh(db_meal)
-
-    # Add ingredients (handling many-to-many)
-    for ingredient in meal.ingredients:
-        # Check if ingredient already exists
-        db_ingredient = db.query(Ingredient).filter_by(name=ingredient.name).first()
-        if not db_ingredient:
-            db_ingredient = Ingredient(name=ingredient.name, quantity=ingredient.quantity, unit=ingredient.unit)
-            db.add(db_ingredient)
-            db.commit()  # Commit new ingredient to get its ID
-
-        db_meal.ingredients.append(db_ingredient)  # Associate meal with ingredient
-
-
-    for direction in meal.directions:
-        db_direction = db.query(Direction).filter_by(step_number=direction.step_number, meal_id=db_meal.meal_id).first()
-
-        if not db_direction:
-            db_direction = Direction(
-                step_number=direction.step_number,
-                description=direction.description,
-            )
-            db_direction.meal = db_meal  # ✅ Associate with meal before commit
-            db.add(db_direction)
-            db.commit()
-
-        db_meal.directions.append(db_direction)
-
-    for entry in meal.log_entries:
-        db_entry = LogEntry(
-            date=entry.date,
-            rating=entry.rating,
-            notes=entry.notes,
-        )
-        db_entry.meal = db_meal
-        db.add(db_entry)
-
-    db.commit()
-    db.refresh(db_meal)
+    if plan is None:
+        raise HTTPException(status_code=422, detail="No plan satisfies these constraints")
+    return ORJSONResponse(plan)
+
+
+# Sums the ingredient amounts of the given meals (repeat an id to cook it twice).
+@app.get("/shopping-list", response_model=list[ShoppingItem], response_class=ORJSONResponse,
+         dependencies=[Depends(http_cache.list_etag)])
+async def get_shopping_list(meal_ids: list[int] = Query(...), db: AsyncSession = Depends(get_db)):
+    return ORJSONResponse(await db.run_sync(shopping.shopping_list, meal_ids))
+
+
+def _filter_meals(query, q=None, cuisine_type=None, cooking_mode=None, cooking_ease=None,
+                  min_time=None, max_time=None):
+    """Apply the finder's search text and facet filters to a Meal query."""
+    if q:
+        query = query.filter(or_(
+            Meal.name.icontains(q, autoescape=True),
+            Meal.description.icontains(q, autoescape=True),
+        ))
+    if cuisine_type:
+        query = query.filter(Meal.cuisine_type == cuisine_type)
+    if cooking_mode:
+        query = query.filter(Meal.cooking_mode == cooking_mode)
+    if cooking_ease:
+        query = query.filter(Meal.cooking_ease == cooking_ease)
+    if min_time is not None:
+        query = query.filter(Meal.cooking_time >= min_time)
+    if max_time is not None:
+        query = query.filter(Meal.cooking_time <= max_time)
+    return query
+
+
+# Gets a page of meals matching the finder filters.
+# Pagination is keyset based: pass the last meal_id of the previous page as after_id.
+# The page is built once as dicts and encoded by orjson; response_model only documents it.
+@app.get("/meals/", response_model=list[MealResponse], response_class=ORJSONResponse,
+         dependencies=[Depends(http_cache.list_etag)])
+async def read_meals(
+    q: Optional[str] = None,
+    cuisine_type: Optional[str] = None,
+    cooking_mode: Optional[str] = None,
+    cooking_ease: Optional[str] = None,
+    min_time: Optional[int] = None,
+    max_time: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+):
+    query = _filter_meals(select(*MEAL_COLUMNS), q, cuisine_type, cooking_mode, cooking_ease, min_time, max_time)
+    if after_id is not None:
+        query = query.filter(Meal.meal_id > after_id)
+    return ORJSONResponse(await db.run_sync(load_meal_dicts, query.order_by(Meal.meal_id).limit(limit)))
+
+
+# The finder's cards: the same filters and cursor as /meals/, but only the meal's own
+# columns and log totals, from one joined query. Open a meal for its full detail.
+@app.get("/meals/summary", response_model=list[MealSummary], response_class=ORJSONResponse,
+         dependencies=[Depends(http_cache.list_etag)])
+async def read_meal_summaries(
+    q: Optional[str] = None,
+    cuisine_type: Optional[str] = None,
+    cooking_mode: Optional[str] = None,
+    cooking_ease: Optional[str] = None,
+    min_time: Optional[int] = None,
+    max_time: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+):
+    query = select(*SUMMARY_COLUMNS).outerjoin(MealStat, MealStat.meal_id == Meal.meal_id)
+    query = _filter_meals(query, q, cuisine_type, cooking_mode, cooking_ease, min_time, max_time)
+    if after_id is not None:
+        query = query.filter(Meal.meal_id > after_id)
+    return ORJSONResponse(await db.run_sync(load_meal_summaries, query.order_by(Meal.meal_id).limit(limit)))
+
+
+# One meal with its ingredients, directions, log entries and stats
+@app.get("/meals/{meal_id}", response_model=MealResponse, response_class=ORJSONResponse,
+         dependencies=[Depends(http_cache.meal_etag)])
+async def read_meal(meal_id: int, db: AsyncSession = Depends(get_db)):
+    meals = await db.run_sync(load_meal_dicts, select(*MEAL_COLUMNS).where(Meal.meal_id == meal_id))
+    if not meals:
+        raise HTTPException(status_code=404, detail="Meal not found")
+    return ORJSONResponse(meals[0])
 
-    return db_meal
 
 
-# Gets all meals
-@app.get("/meals/", response_model=list[MealResponse])
-async def read_meals(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    meals = (
-        db.query(Meal)
-        .options(joinedload(Meal.ingredients), joinedload(Meal.directions))
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
 
-    # Stats from Meal Log Entries
-    meal_stats = pd.DataFrame(db.execute(text("""
-                                            SELECT 
-                                                meal_id, min(date) first_meal_date, max(date) recent_meal_date, count(meal_id) meal_count, avg(CASE WHEN rating > 0 THEN rating END) avg_rating
-                                            FROM LogEntries
-                                            WHERE meal_id IS NOT NULL
-                                            GROUP BY meal_id
-                                            LIMIT :limit 
-                                            OFFSET :offset
-                                            """), {'offset':skip, 'limit':limit}).all()
-                                            )
-    if meal_stats.shape[0] > 0:
-        records = meal_stats.to_dict(orient='records')
-        meal_stats = [{k: (None if isinstance(v, float) and pd.isna(v) else v) for k, v in row.items()} for row in records]
-    else:
-        meal_stats = []
-
-    #print(meal_stats)
-    meal_stats_list = []
-    for row in meal_stats:
-        meal_stats_list.append(
-            MealStats(
-                meal_id = int(row['meal_id']),
-                first_meal_date=row['first_meal_date'],
-                recent_meal_date=row['recent_meal_date'],
-                meal_count=row['meal_count'],
-                avg_rating=row['avg_rating']
-            )
-        )
-    print(meal_stats_list)
-    return [
-        MealResponse(
-            meal_id=meal.meal_id,
-            name=meal.name,
-            description=meal.description,
-            cuisine_type=meal.cuisine_type,
-            cooking_mode=meal.cooking_mode,
-            cooking_ease=meal.cooking_ease,
-            cooking_time=meal.cooking_time,
-            image_path=meal.image_path,
-            ingredients=[
-                IngredientResponse.model_validate(ing.__dict__) for ing in meal.ingredients
-            ],
-            directions=[
-                DirectionResponse.model_validate(dir.__dict__) for dir in meal.directions
-            ], log_entries=[
-                LogEntryResponse.model_validate(ent.__dict__) for ent in meal.log_entries
-            ], meal_stats=[MealStats.model_validate(m.__dict__) for m in meal_stats_list if m.meal_id == meal.meal_id]
-        )
-        for meal in meals
-    ]
+async def _update_meal(db: AsyncSession, meal_id: int, payload, fields) -> MealResponse:
+    exists = (await db.execute(select(Meal.meal_id).where(Meal.meal_id == meal_id))).first()
+    if exists is None:
+        raise HTTPException(status_code=404, detail="Meal not found")
 
+    if await db.run_sync(meal_updates.apply_meal_update, meal_id, payload, fields):
+        await db.commit()
+        data_version.bump([meal_id])
 
+    return (await db.run_sync(load_meal_page, select(*MEAL_COLUMNS).where(Meal.meal_id == meal_id)))[0]
 
 
-# Changes a single meal
+# Changes a single meal. The full meal is sent, but only the rows that differ are written.
 @app.put("/meals/{meal_id}", response_model=MealResponse)
-async def update_meal(meal_id: int, meal_update: MealCreate, db: Session = Depends(get_db)):
-    db_meal = db.query(Meal).filter(Meal.meal_id == meal_id).first()
+async def update_meal(meal_id: int, meal_update: MealCreate, db: AsyncSession = Depends(get_db)):
+    return await _update_meal(db, meal_id, meal_update, MealCreate.model_fields.keys())
 
-    if db_meal is None:
-        raise HTTPException(status_code=404, detail="Meal not found")
-    
-    # Convert Pydantic model to dict
-    update_data = meal_update.model_dump()
-    #print(update_data)
-
-    # ✅ Only update valid attributes
-    for key, value in update_data.items():
-        if hasattr(db_meal, key) and not isinstance(value, list): # This process cannot properly handle relationships
-            setattr(db_meal, key, value)
-        #else:
-            #print(f"Skipping unknown attribute: {key}")  # Debugging
-
-    # ✅ Clear and replace ingredients
-    if "ingredients" in update_data:
-        db_meal.ingredients.clear()  # Remove old ingredients
-        for ingredient_data in update_data["ingredients"]:
-            ingredient = db.query(Ingredient).filter_by(name=ingredient_data["name"]).first()
-            if not ingredient:
-                ingredient = Ingredient(**ingredient_data)  # Create new if not found
-                db.add(ingredient)
-            db_meal.ingredients.append(ingredient)  # Add to meal
-
-    if "directions" in update_data:
-        # ❌ Don't use .clear()—this causes the blanking issue!
-        db.query(Direction).filter(Direction.meal_id == db_meal.meal_id).delete()  # Delete old directions
-        
-        for direction_data in update_data["directions"]:
-            new_direction = Direction(
-                meal_id=db_meal.meal_id,  # ✅ Ensure foreign key is set
-                step_number=direction_data["step_number"],
-                description=direction_data["description"]
-            )
-            db.add(new_direction)  # Add new direction
-
-    if "log_entries" in update_data:
-        # ❌ Don't use .clear()—this causes the blanking issue!
-        db.query(LogEntry).filter(LogEntry.meal_id == db_meal.meal_id).delete()  # Delete old directions
-        
-        for entry in update_data["log_entries"]:
-            new_entry = LogEntry(
-                meal_id=db_meal.meal_id,  # ✅ Ensure foreign key is set
-                date=entry["date"],
-                rating=entry["rating"],
-                notes=entry['notes']
-            )
-            db.add(new_entry)  # Add new direction
-
-    db.commit()
-    db.refresh(db_meal)
-
-    return db_meal
+
+# Changes only the fields present in the request body
+@app.patch("/meals/{meal_id}", response_model=MealResponse)
+async def patch_meal(meal_id: int, meal_patch: MealPatch, db: AsyncSession = Depends(get_db)):
+    return await _update_meal(db, meal_id, meal_patch, meal_patch.model_fields_set)
 
 
 # Deletes a single meal
 @app.delete("/meals/{meal_id}", response_model=dict)
-async def delete_meal(meal_id: int, db: Session = Depends(get_db)):
-    meal = db.query(Meal).filter(Meal.meal_id == meal_id).first()
-    if meal is None:
+async def delete_meal(meal_id: int, db: AsyncSession = Depends(get_db)):
+    if not await db.run_sync(meal_updates.delete_meal, meal_id):
         raise HTTPException(status_code=404, detail="Meal not found")
-    
-    db.delete(meal)
-    db.commit()
+
+    await db.commit()
+    data_version.bump([meal_id])
     return {"detail": "Meal deleted"}
 
 
@@ -263,28 +342,41 @@ async def gotoentry(request:Request):
 
 
 # Returns the meal entry form web page
-@app.get('/find', response_class=HTMLResponse)
+@app.get('/find', response_class=HTMLResponse, dependencies=[Depends(http_cache.page_etag)])
 async def meal_entry_form(request:Request):
     return templates.TemplateResponse('meal_finder.html', {'request':request})
 
 
 
 # Returns the meal entry form web page
-@app.get('/meal/{meal_id}', response_class=HTMLResponse)
-async def meal_entry_form(request: Request, meal_id: int, db: Session = Depends(get_db)):
-    meal = (
-        db.query(Meal)
+@app.get('/meal/{meal_id}', response_class=HTMLResponse, dependencies=[Depends(http_cache.meal_etag)])
+async def meal_entry_form(request: Request, meal_id: int, db: AsyncSession = Depends(get_db)):
+    key = (meal_id, str(request.base_url))
+    html = meal_pages.get(key, meal_id)
+    if html is not None:
+        return HTMLResponse(html)
+    version = data_version.meal_version(meal_id)
+
+    # Relationships must be loaded eagerly: lazy loads can't run on an AsyncSession
+    meal = (await db.execute(
+        select(Meal)
         .options(
-            subqueryload(Meal.ingredients),  # ✅ Fix: Use subqueryload for Many-to-Many
-            joinedload(Meal.directions),  # ✅ Works fine for One-to-Many
-            joinedload(Meal.log_entries)
+            selectinload(Meal.directions),
+            selectinload(Meal.log_entries)
         )
         .filter(Meal.meal_id == meal_id)
-        .first()
-    )
+    )).scalars().first()
 
     if not meal:
         return HTMLResponse(content="Meal not found", status_code=404)
+
+    # The amounts are per recipe, on the association rows
+    assoc = meal_ingredients_association_table
+    ingredients = (await db.execute(
+        select(Ingredient.ingredient_id, Ingredient.name, assoc.c.quantity, assoc.c.unit)
+        .join(assoc, assoc.c.ingredient_id == Ingredient.ingredient_id)
+        .where(assoc.c.meal_id == meal_id)
+    )).all()
     
     meal_data = {
         "meal_id": meal.meal_id,
@@ -297,149 +389,121 @@ async def meal_entry_form(request: Request, meal_id: int, db: Session = Depends(
         "image_path": meal.image_path,
         "ingredients": [
             {"ingredient_id": ing.ingredient_id, "name": ing.name, "quantity": ing.quantity, "unit": ing.unit}
-            for ing in meal.ingredients
+            for ing in ingredients
         ],
         "directions": [
             {"step_number": dir.step_number, "description": dir.description}
             for dir in meal.directions
         ],
         "logEntries": [
-            {"date": log_entry.date, "rating":log_entry.rating, "notes":log_entry.notes}
+            {"log_entry_id": log_entry.log_entry_id, "date": log_entry.date and log_entry.date.isoformat(),
+             "rating": log_entry.rating, "notes": log_entry.notes}
             for log_entry in meal.log_entries
         ],
     }
 
-    return templates.TemplateResponse('meal_entry_form.html', {'request': request, 'meal': meal_data})
+    response = templates.TemplateResponse('meal_entry_form.html', {'request': request, 'meal': meal_data})
+    meal_pages.put(key, version, response.body)
+    return response
 
 
 
 
 # Returns the meal entry form web page
-@app.get('/entry', response_class=HTMLResponse)
+@app.get('/entry', response_class=HTMLResponse, dependencies=[Depends(http_cache.page_etag)])
 async def meal_entry_form(request:Request):
     return templates.TemplateResponse('meal_entry_form.html', {'request':request, 'meal':{'meal_id':-1}})
 
 
 
-@app.get('/dashboard', response_class=HTMLResponse)
-async def dashboard(request: Request, db: Session = Depends(get_db)):
-    total_meals = db.query(Meal).count()
-    total_log_entries = db.query(LogEntry).count()
-
-    # Aggregate stats
-    agg_stats = db.execute(text("""
-        SELECT
-            count(DISTINCT meal_id) meals_logged,
-            avg(CASE WHEN rating > 0 THEN rating END) avg_rating,
-            min(date) first_log_date,
-            max(date) latest_log_date
-        FROM LogEntries
-        WHERE meal_id IS NOT NULL
-    """)).first()
-
-    # Breakdown by cuisine type
-    cuisine_breakdown = db.execute(text("""
-        SELECT cuisine_type, count(*) count
-        FROM Meals
-        WHERE cuisine_type IS NOT NULL AND cuisine_type != ''
-        GROUP BY cuisine_type
-        ORDER BY count DESC
-    """)).all()
-
-    # Breakdown by cooking mode
-    mode_breakdown = db.execute(text("""
-        SELECT cooking_mode, count(*) count
-        FROM Meals
-        WHERE cooking_mode IS NOT NULL AND cooking_mode != ''
-        GROUP BY cooking_mode
-        ORDER BY count DESC
-    """)).all()
-
-    # Breakdown by cooking ease
-    ease_breakdown = db.execute(text("""
-        SELECT cooking_ease, count(*) count
-        FROM Meals
-        WHERE cooking_ease IS NOT NULL AND cooking_ease != ''
-        GROUP BY cooking_ease
-        ORDER BY count DESC
-    """)).all()
-
-    # Most cooked meals (top 5)
-    most_cooked = db.execute(text("""
-        SELECT m.meal_id, m.name, count(l.log_entry_id) times_cooked, avg(CASE WHEN l.rating > 0 THEN l.rating END) avg_rating
-        FROM LogEntries l
-        JOIN Meals m ON m.meal_id = l.meal_id
-        GROUP BY m.meal_id
-        ORDER BY times_cooked DESC
-        LIMIT 5
-    """)).all()
-
-    # Recently logged meals (last 10)
-    recent_logs = db.execute(text("""
-        SELECT l.date, l.rating, l.notes, m.meal_id, m.name
-        FROM LogEntries l
-        JOIN Meals m ON m.meal_id = l.meal_id
-        ORDER BY l.date DESC
-        LIMIT 10
-    """)).all()
-
-    # Recently added meals (last 5)
-    recent_meals = (
-        db.query(Meal)
-        .order_by(Meal.meal_id.desc())
-        .limit(5)
-        .all()
-    )
+@app.get('/dashboard', response_class=HTMLResponse, dependencies=[Depends(http_cache.list_etag)])
+async def dashboard(request: Request, db: AsyncSession = Depends(get_db)):
+    dashboard_data = await db.run_sync(get_dashboard_data)
+    return templates.TemplateResponse('dashboard.html', {'request': request, 'data': dashboard_data})
 
-    dashboard_data = {
-        "total_meals": total_meals,
-        "total_log_entries": total_log_entries,
-        "meals_logged": (agg_stats.meals_logged or 0) if agg_stats else 0,
-        "avg_rating": round(agg_stats.avg_rating, 1) if agg_stats and agg_stats.avg_rating else 0,
-        "first_log_date": (agg_stats.first_log_date or "N/A") if agg_stats else "N/A",
-        "latest_log_date": (agg_stats.latest_log_date or "N/A") if agg_stats else "N/A",
-        "cuisine_breakdown": [{"label": r.cuisine_type, "count": r.count} for r in cuisine_breakdown],
-        "mode_breakdown": [{"label": r.cooking_mode, "count": r.count} for r in mode_breakdown],
-        "ease_breakdown": [{"label": r.cooking_ease, "count": r.count} for r in ease_breakdown],
-        "most_cooked": [
-            {"meal_id": r.meal_id, "name": r.name, "times_cooked": r.times_cooked,
-             "avg_rating": round(r.avg_rating, 1) if r.avg_rating else "N/A"}
-            for r in most_cooked
-        ],
-        "recent_logs": [
-            {"date": r.date, "rating": r.rating, "notes": r.notes,
-             "meal_id": r.meal_id, "name": r.name}
-            for r in recent_logs
-        ],
-        "recent_meals": [
-            {"meal_id": m.meal_id, "name": m.name, "cuisine_type": m.cuisine_type or ""}
-            for m in recent_meals
-        ],
-    }
 
-    return templates.TemplateResponse('dashboard.html', {'request': request, 'data': dashboard_data})
+# Same numbers as the dashboard page, served from the same cache
+@app.get('/api/dashboard', response_model=dict, dependencies=[Depends(http_cache.list_etag)])
+async def dashboard_json(db: AsyncSession = Depends(get_db)):
+    return await db.run_sync(get_dashboard_data)
+
+
+# Cooking-log analytics, cached per data version (see analytics.py)
+@app.get('/api/analytics/cooks', response_model=list[CookCount], response_class=ORJSONResponse,
+         dependencies=[Depends(http_cache.list_etag)])
+async def analytics_cooks(
+    period: Literal["week", "month"] = "week",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    return ORJSONResponse(await db.run_sync(analytics.cooks_per_period, period, start, end))
+
+
+@app.get('/api/analytics/ratings', response_model=list[RatingTrendPoint], response_class=ORJSONResponse,
+         dependencies=[Depends(http_cache.list_etag)])
+async def analytics_ratings(
+    by: Literal["cuisine", "meal"] = "cuisine",
+    period: Literal["week", "month"] = "month",
+    meal_id: Optional[int] = None,
+    cuisine_type: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    return ORJSONResponse(await db.run_sync(analytics.rating_trend, by, period, meal_id, cuisine_type, start, end))
+
+
+@app.get('/api/analytics/streaks', response_model=CookingStreaks, response_class=ORJSONResponse,
+         dependencies=[Depends(http_cache.daily_etag)])
+async def analytics_streaks(db: AsyncSession = Depends(get_db)):
+    return ORJSONResponse(await db.run_sync(analytics.streaks))
+
+
+@app.get('/api/analytics/neglected', response_model=list[NeglectedMeal], response_class=ORJSONResponse,
+         dependencies=[Depends(http_cache.daily_etag)])
+async def analytics_neglected(
+    limit: int = Query(20, ge=1, le=200),
+    min_cooks: int = Query(1, ge=1),
+    db: AsyncSession = Depends(get_db),
+):
+    return ORJSONResponse(await db.run_sync(analytics.longest_since_cooked, limit, min_cooks))
+
+
+# Request latency, response size and SQL statement histograms in the Prometheus text format
+@app.get('/metrics', response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# The latest statements slower than SLOW_QUERY_MS, with their query plans (empty unless it is set)
+@app.get('/metrics/slow-queries', response_model=list[dict])
+async def get_slow_queries():
+    return list(metrics.slow_queries)
 
 
 # Endpoint to handle image upload
 @app.post("/meals/{meal_id}/upload-image/")
-async def upload_image(meal_id: int, image: UploadFile = File(...), db: Session = Depends(get_db)):
-    # Define the directory to save uploaded images
+async def upload_image(meal_id: int, background_tasks: BackgroundTasks, image: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
     if image:
-        # Define the directory to save uploaded images
-        upload_directory = "assets/images"
-        os.makedirs(upload_directory, exist_ok=True)
+        # Stored under its content hash, so re-uploading the same picture reuses the file
+        content_hash, file_location = await images.save_upload(image)
+        variants = await db.run_sync(images.known_variants, content_hash)
 
-        # Save the uploaded file
-        file_location = f"{upload_directory}/{image.filename}"
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-
-        # Create a new Image record in the database
-        new_image = Image(meal_id=meal_id, path=file_location)
+        new_image = Image(meal_id=meal_id, path=file_location, content_hash=content_hash, **(variants or {}))
         db.add(new_image)
-        db.commit()
-        db.refresh(new_image)
+        # The form fills image_path with the picked file's name; point the meal at the stored file instead
+        stored_name = os.path.basename(file_location)
+        await db.execute(
+            update(Meal)
+            .where(Meal.meal_id == meal_id, or_(Meal.image_path.is_(None), Meal.image_path == image.filename))
+            .values(image_path=stored_name)
+        )
+        await db.commit()
+        data_version.bump([meal_id])
+        if variants is None:
+            background_tasks.add_task(images.render_in_background, meal_id, new_image.image_id, file_location, content_hash)
 
-        return {"message": "Image uploaded successfully", "image_id": new_image.image_id}
+        return {"message": "Image uploaded successfully", "image_id": new_image.image_id, "image_path": stored_name}
     else:
         return {"message": "Image upload unsuccessful"}
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""Batched loading of meal pages for the JSON API.
+
+The page of meals is fetched first, then each child table is read with a single
+`meal_id IN (...)` query (the same shape as SQLAlchemy's selectinload), so a page
+costs a fixed number of queries however many meals, ingredients, directions or
+log entries it holds.
+
+load_meal_dicts builds each meal once, as plain dicts in MealResponse's shape, for
+the list endpoints to encode with orjson without response_model validating them a
+second time. Every value already comes from a typed column, so nothing is lost.
+
+load_meal_summaries is the lean version for finder cards: the meal's columns and its
+MealStats totals from one joined query, plus the card image lookup, and no child rows.
+"""
+from collections import defaultdict
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Meal, MealStat, Ingredient, Direction, LogEntry, meal_ingredients_association_table
+from schemas import MealResponse
+from meal_stats import get_meal_stats
+from images import card_images
+
+
+MEAL_COLUMNS = (
+    Meal.meal_id,
+    Meal.name,
+    Meal.description,
+    Meal.cuisine_type,
+    Meal.cooking_mode,
+    Meal.cooking_ease,
+    Meal.cooking_time,
+    Meal.image_path,
+)
+
+# Select these with .outerjoin(MealStat, MealStat.meal_id == Meal.meal_id) for load_meal_summaries
+SUMMARY_COLUMNS = MEAL_COLUMNS + (
+    MealStat.meal_count,
+    MealStat.recent_meal_date,
+    MealStat.rating_sum,
+    MealStat.rating_count,
+)
+
+
+def _group_by_meal(db: Session, query):
+    """Run query (meal_id first, then the child's fields) and group its rows by meal_id as dicts.
+
+    It runs on the session's connection: plain Core rows skip the ORM result machinery,
+    which costs more than the query itself on large pages.
+    """
+    result = db.connection().execute(query)
+    fields = list(result.keys())[1:]
+    grouped = defaultdict(list)
+    for meal_id, *values in result:
+        grouped[meal_id].append(dict(zip(fields, values)))
+    return grouped
+
+
+def load_children(db: Session, meal_ids):
+    """Fetch ingredients, directions and log entries for meal_ids: one query per child table.
+
+    Returns three {meal_id: [dict, ...]} maps, the dicts shaped like the response schemas.
+    """
+    if not meal_ids:
+        return {}, {}, {}
+    assoc = meal_ingredients_association_table
+
+    ingredients = _group_by_meal(
+        db,
+        select(assoc.c.meal_id, Ingredient.name, assoc.c.quantity, assoc.c.unit)
+        .join(Ingredient, Ingredient.ingredient_id == assoc.c.ingredient_id)
+        .where(assoc.c.meal_id.in_(meal_ids)),
+    )
+    directions = _group_by_meal(
+        db,
+        select(Direction.meal_id, Direction.step_number, Direction.description)
+        .where(Direction.meal_id.in_(meal_ids))
+        .order_by(Direction.meal_id, Direction.step_number),
+    )
+    log_entries = _group_by_meal(
+        db,
+        select(LogEntry.meal_id, LogEntry.log_entry_id, LogEntry.date, LogEntry.rating, LogEntry.notes)
+        .where(LogEntry.meal_id.in_(meal_ids))
+        .order_by(LogEntry.meal_id, LogEntry.log_entry_id),
+    )
+    return ingredients, directions, log_entries
+
+
+def load_meal_dicts(db: Session, query) -> list[dict]:
+    """Run a select over MEAL_COLUMNS and return the matching meals, with children and stats, as dicts."""
+    meals = db.connection().execute(query).all()
+    meal_ids = [m.meal_id for m in meals]
+    ingredients, directions, log_entries = load_children(db, meal_ids)
+    stats = get_meal_stats(db, meal_ids)
+    cards = card_images(db, {m.image_path for m in meals})
+    return [
+        {
+            "meal_id": m.meal_id,
+            "name": m.name,
+            "description": m.description,
+            "cuisine_type": m.cuisine_type,
+            "cooking_mode": m.cooking_mode,
+            "cooking_ease": m.cooking_ease,
+            "cooking_time": m.cooking_time,
+            "image_path": m.image_path,
+            "card_image_path": cards.get(m.image_path),
+            "ingredients": ingredients.get(m.meal_id, []),
+            "directions": directions.get(m.meal_id, []),
+            "log_entries": log_entries.get(m.meal_id, []),
+            "meal_stats": [stats[m.meal_id]] if m.meal_id in stats else [],
+        }
+        for m in meals
+    ]
+
+
+def load_meal_page(db: Session, query) -> list[MealResponse]:
+    """Like load_meal_dicts, as validated MealResponse models."""
+    return [MealResponse.model_validate(meal) for meal in load_meal_dicts(db, query)]
+
+
+def load_meal_summaries(db: Session, query) -> list[dict]:
+    """Run a select over SUMMARY_COLUMNS and return the meals as dicts shaped like MealSummary."""
+    meals = db.connection().execute(query).all()
+    cards = card_images(db, {m.image_path for m in meals})
+    return [
+        {
+            "meal_id": m.meal_id,
+            "name": m.name,
+            "description": m.description,
+            "cuisine_type": m.cuisine_type,
+            "cooking_mode": m.cooking_mode,
+            "cooking_ease": m.cooking_ease,
+            "cooking_time": m.cooking_time,
+            "image_path": m.image_path,
+            "card_image_path": cards.get(m.image_path),
+            "meal_count": m.meal_count or 0,
+            "recent_meal_date": m.recent_meal_date,
+            "avg_rating": m.rating_sum / m.rating_count if m.rating_count else None,
+        }
+        for m in meals
+    ]
@@ -0,0 +1,126 @@
+"""Incrementally maintained per-meal statistics (the MealStats table).
+
+Reading stats is a primary-key lookup per meal instead of a GROUP BY over the whole
+LogEntries table. New log entries are folded in with an upsert; when entries are
+deleted the affected meals are re-aggregated from their own log rows only.
+
+Run `python meal_stats.py` to rebuild the table from LogEntries.
+"""
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+def _ids_param(meal_ids):
+    return "[" + ",".join(str(int(i)) for i in meal_ids) + "]"
+
+
+def ensure_meal_stats(engine):
+    """Fill MealStats on the first start after the table was added."""
+    with engine.begin() as conn:
+        empty = conn.execute(text("SELECT 1 FROM MealStats LIMIT 1")).first() is None
+        has_logs = conn.execute(text("SELECT 1 FROM LogEntries WHERE meal_id IS NOT NULL LIMIT 1")).first()
+        if empty and has_logs:
+            _refresh(conn)
+
+
+def add_log_entries(db: Session, meal_id: int, entries):
+    """Fold newly inserted log entries (objects with date and rating) into the meal's stats."""
+    add_log_rows(db, [{"meal_id": meal_id, "date": e.date, "rating": e.rating} for e in entries])
+
+
+def add_log_rows(db: Session, rows):
+    """Like add_log_entries, for dicts with meal_id, date and rating spanning any number of meals."""
+    params = [
+        {
+            "meal_id": r["meal_id"],
+            # Raw SQL gets no Date type processing; store the same ISO text the column does
+            "date": r["date"].isoformat() if isinstance(r["date"], date) else r["date"],
+            "rating_sum": r["rating"] if r["rating"] and r["rating"] > 0 else 0,
+            "rating_count": 1 if r["rating"] and r["rating"] > 0 else 0,
+        }
+        for r in rows
+    ]
+    if not params:
+        return
+    db.execute(text("""
+        INSERT INTO MealStats (meal_id, first_meal_date, recent_meal_date, meal_count, rating_sum, rating_count)
+        VALUES (:meal_id, :date, :date, 1, :rating_sum, :rating_count)
+        ON CONFLICT (meal_id) DO UPDATE SET
+            -- Multi-argument min()/max() return NULL if any argument is; ignore a missing date like min(date) does
+            first_meal_date = min(coalesce(first_meal_date, excluded.first_meal_date),
+                                  coalesce(excluded.first_meal_date, first_meal_date)),
+            recent_meal_date = max(coalesce(recent_meal_date, excluded.recent_meal_date),
+                                   coalesce(excluded.recent_meal_date, recent_meal_date)),
+            meal_count = meal_count + 1,
+            rating_sum = rating_sum + excluded.rating_sum,
+            rating_count = rating_count + excluded.rating_count
+    """), params)
+
+
+def _refresh(conn, meal_ids=None):
+    if meal_ids is None:
+        conn.execute(text("DELETE FROM MealStats"))
+        where, params = "meal_id IS NOT NULL", {}
+    else:
+        params = {"ids": _ids_param(meal_ids)}
+        conn.execute(text("DELETE FROM MealStats WHERE meal_id IN (SELECT value FROM json_each(:ids))"), params)
+        where = "meal_id IN (SELECT value FROM json_each(:ids))"
+    conn.execute(text(f"""
+        INSERT INTO MealStats (meal_id, first_meal_date, recent_meal_date, meal_count, rating_sum, rating_count)
+        SELECT
+            meal_id, min(date), max(date), count(*),
+            coalesce(sum(CASE WHEN rating > 0 THEN rating END), 0),
+            count(CASE WHEN rating > 0 THEN 1 END)
+        FROM LogEntries
+        WHERE {where}
+        GROUP BY meal_id
+    """), params)
+
+
+def refresh_meal_stats(db: Session, meal_ids):
+    """Re-aggregate stats for these meals from their log rows, e.g. after entries were deleted."""
+    db.flush()
+    _refresh(db.connection(), list(meal_ids))
+
+
+def remove_meal_stats(db: Session, meal_id: int):
+    db.execute(text("DELETE FROM MealStats WHERE meal_id = :meal_id"), {"meal_id": meal_id})
+
+
+def rebuild_meal_stats(db: Session):
+    _refresh(db.connection())
+
+
+def get_meal_stats(db: Session, meal_ids) -> dict[int, dict]:
+    """Stats for the given meals keyed by meal_id, as dicts shaped like schemas.MealStats; meals never logged are absent."""
+    if not meal_ids:
+        return {}
+    rows = db.execute(text("""
+        SELECT meal_id, first_meal_date, recent_meal_date, meal_count, rating_sum, rating_count
+        FROM MealStats
+        WHERE meal_id IN (SELECT value FROM json_each(:ids))
+    """), {"ids": _ids_param(meal_ids)})
+    return {
+        r.meal_id: {
+            "meal_id": r.meal_id,
+            "first_meal_date": r.first_meal_date,
+            "recent_meal_date": r.recent_meal_date,
+            "meal_count": r.meal_count,
+            "avg_rating": r.rating_sum / r.rating_count if r.rating_count else None,
+        }
+        for r in rows
+    }
+
+
+if __name__ == '__main__':
+    from db_config import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rebuild_meal_stats(db)
+        db.commit()
+    finally:
+        db.close()
+    print('meal stats rebuilt')
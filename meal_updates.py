@@ -0,0 +1,158 @@
+"""Diff-based meal updates.
+
+Incoming ingredients, directions and log entries are compared with the stored rows
+and only the differences are written, so saving a recipe whose name changed touches
+one row instead of rewriting every child, and log entries keep their log_entry_id.
+"""
+from sqlalchemy import select, update, delete, insert
+from sqlalchemy.orm import Session
+
+from models import Meal, Direction, LogEntry, Image, Rating, meal_ingredients_association_table
+from bulk import MEAL_FIELDS
+from ingredients import resolve_ingredients
+import meal_stats
+import search
+
+
+def _update_fields(db: Session, meal_id: int, wanted: dict) -> set:
+    if not wanted:
+        return set()
+    current = db.execute(
+        select(*(getattr(Meal, f) for f in wanted)).where(Meal.meal_id == meal_id)
+    ).one()._asdict()
+    changed = {f: v for f, v in wanted.items() if current[f] != v}
+    if changed:
+        db.execute(update(Meal).where(Meal.meal_id == meal_id).values(**changed))
+    return set(changed)
+
+
+def _sync_ingredients(db: Session, meal_id: int, ingredients) -> bool:
+    assoc = meal_ingredients_association_table
+    ingredient_ids = resolve_ingredients(db, ingredients)
+    wanted = {}
+    for ing in ingredients:
+        wanted.setdefault(ingredient_ids[ing.name], (ing.quantity, ing.unit))
+    current = {
+        r.ingredient_id: (r.quantity, r.unit)
+        for r in db.execute(select(assoc.c.ingredient_id, assoc.c.quantity, assoc.c.unit).where(assoc.c.meal_id == meal_id))
+    }
+    removed = [i for i in current if i not in wanted]
+    added = [{"meal_id": meal_id, "ingredient_id": i, "quantity": q, "unit": u}
+             for i, (q, u) in wanted.items() if i not in current]
+    changed = [(i, q, u) for i, (q, u) in wanted.items() if i in current and current[i] != (q, u)]
+    if removed:
+        db.execute(delete(assoc).where(assoc.c.meal_id == meal_id, assoc.c.ingredient_id.in_(removed)))
+    if added:
+        db.execute(insert(assoc), added)
+    for ingredient_id, quantity, unit in changed:
+        db.execute(
+            update(assoc)
+            .where(assoc.c.meal_id == meal_id, assoc.c.ingredient_id == ingredient_id)
+            .values(quantity=quantity, unit=unit)
+        )
+    return bool(removed or added or changed)
+
+
+def _sync_directions(db: Session, meal_id: int, directions) -> bool:
+    wanted = {}
+    for d in directions:
+        wanted.setdefault(d.step_number, d.description)
+    current = dict(db.execute(
+        select(Direction.step_number, Direction.description).where(Direction.meal_id == meal_id)
+    ).all())
+    removed = [step for step in current if step not in wanted]
+    added = [{"meal_id": meal_id, "step_number": step, "description": desc}
+             for step, desc in wanted.items() if step not in current]
+    changed = [{"meal_id": meal_id, "step_number": step, "description": desc}
+               for step, desc in wanted.items() if step in current and current[step] != desc]
+    if removed:
+        db.execute(delete(Direction).where(Direction.meal_id == meal_id, Direction.step_number.in_(removed)))
+    if added:
+        db.execute(insert(Direction), added)
+    for row in changed:
+        db.execute(
+            update(Direction)
+            .where(Direction.meal_id == meal_id, Direction.step_number == row["step_number"])
+            .values(description=row["description"])
+        )
+    return bool(removed or added or changed)
+
+
+def _sync_log_entries(db: Session, meal_id: int, entries):
+    """Returns (inserted rows, whether any row was updated or deleted).
+
+    Entries are matched on log_entry_id; entries without one (older clients) claim an
+    unmatched stored row with identical date, rating and notes before being inserted.
+    """
+    current = {
+        r.log_entry_id: r for r in db.execute(
+            select(LogEntry.log_entry_id, LogEntry.date, LogEntry.rating, LogEntry.notes)
+            .where(LogEntry.meal_id == meal_id)
+        )
+    }
+    unclaimed = dict(current)
+    updates, inserts = [], []
+    for e in entries:
+        row = unclaimed.pop(e.log_entry_id, None) if e.log_entry_id is not None else None
+        if row is None and e.log_entry_id is None:
+            row = next((r for r in unclaimed.values() if (r.date, r.rating, r.notes) == (e.date, e.rating, e.notes)), None)
+            if row is not None:
+                del unclaimed[row.log_entry_id]
+        if row is None:
+            inserts.append({"meal_id": meal_id, "date": e.date, "rating": e.rating, "notes": e.notes})
+        elif (row.date, row.rating, row.notes) != (e.date, e.rating, e.notes):
+            updates.append({"log_entry_id": row.log_entry_id, "date": e.date, "rating": e.rating, "notes": e.notes})
+
+    if unclaimed:
+        db.execute(delete(LogEntry).where(LogEntry.log_entry_id.in_(list(unclaimed))))
+    for row in updates:
+        db.execute(
+            update(LogEntry).where(LogEntry.log_entry_id == row["log_entry_id"])
+            .values(date=row["date"], rating=row["rating"], notes=row["notes"])
+        )
+    if inserts:
+        db.execute(insert(LogEntry), inserts)
+    return inserts, bool(unclaimed or updates)
+
+
+def apply_meal_update(db: Session, meal_id: int, payload, fields) -> bool:
+    """Write the differences between the stored meal and payload, without committing.
+
+    Only the attributes named in fields are applied; a list field replaces the stored
+    children of that kind. Returns True when anything was written.
+    """
+    changed_fields = _update_fields(db, meal_id, {f: getattr(payload, f) for f in fields if f in MEAL_FIELDS})
+    ingredients_changed = "ingredients" in fields and _sync_ingredients(db, meal_id, payload.ingredients or [])
+    directions_changed = "directions" in fields and _sync_directions(db, meal_id, payload.directions or [])
+
+    logs_changed = False
+    if "log_entries" in fields:
+        inserted, rewritten = _sync_log_entries(db, meal_id, payload.log_entries or [])
+        if rewritten:
+            meal_stats.refresh_meal_stats(db, [meal_id])
+        elif inserted:
+            meal_stats.add_log_rows(db, inserted)
+        logs_changed = bool(inserted or rewritten)
+
+    if changed_fields & {"name", "description"} or ingredients_changed or directions_changed:
+        search.index_meal(db, meal_id)
+    return bool(changed_fields or ingredients_changed or directions_changed or logs_changed)
+
+
+def delete_meal(db: Session, meal_id: int) -> bool:
+    """Delete a meal and its directions and ingredient links, without committing.
+
+    Log entries, images and ratings are kept but detached (meal_id set to NULL), as the
+    ORM relationships did. Returns False when there is no such meal.
+    """
+    if db.execute(select(Meal.meal_id).where(Meal.meal_id == meal_id)).first() is None:
+        return False
+    assoc = meal_ingredients_association_table
+    search.remove_meal(db, meal_id)
+    meal_stats.remove_meal_stats(db, meal_id)
+    db.execute(delete(assoc).where(assoc.c.meal_id == meal_id))
+    db.execute(delete(Direction).where(Direction.meal_id == meal_id))
+    for model in (LogEntry, Image, Rating):
+        db.execute(update(model).where(model.meal_id == meal_id).values(meal_id=None))
+    db.execute(delete(Meal).where(Meal.meal_id == meal_id))
+    return True
@@ -0,0 +1,203 @@
+"""Request and SQL metrics, served in the Prometheus text format at /metrics.
+
+MetricsMiddleware times every request and measures the bytes sent, by route template
+("/meals/{meal_id}", not the raw path). The engines in db_config are instrumented with
+SQLAlchemy cursor events. Each statement's time is added to the request that issued it
+(a context variable, which SQLAlchemy carries into run_sync) and to process totals.
+
+Setting SLOW_QUERY_MS logs statements slower than that many milliseconds, with
+their EXPLAIN QUERY PLAN, to the "meals.slow_queries" logger. The most recent ones
+are also kept for /metrics/slow-queries.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+
+
+SLOW_QUERY_MS = float(os.environ["SLOW_QUERY_MS"]) if os.environ.get("SLOW_QUERY_MS") else None
+SLOW_QUERY_KEEP = 50
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+slow_query_log = logging.getLogger("meals.slow_queries")
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, as Prometheus expects it."""
+
+    def __init__(self, name: str, help: str, buckets):
+        self.name, self.help, self.buckets = name, help, tuple(buckets)
+        self._series = {}   # labels tuple -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels: tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, label_names) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+@dataclass
+class _RequestStats:
+    statements: int = 0
+    statement_seconds: float = 0.0
+
+
+_current = ContextVar("request_stats", default=None)
+_lock = threading.Lock()
+
+# Labels: method, route, status
+request_latency = Histogram("http_request_duration_seconds", "Time to serve a request.", LATENCY_BUCKETS)
+# Labels: method, route
+response_size = Histogram("http_response_size_bytes", "Bytes in the response body, after compression.", SIZE_BUCKETS)
+request_statements = Histogram("db_statements_per_request", "SQL statements executed per request.", STATEMENT_BUCKETS)
+request_statement_time = Histogram("db_statement_seconds_per_request", "Time spent in SQL per request.", LATENCY_BUCKETS)
+# Process totals, including work outside requests (startup, background tasks)
+_totals = {"statements": 0, "statement_seconds": 0.0, "slow_statements": 0}
+slow_queries = deque(maxlen=SLOW_QUERY_KEEP)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the statement's context rather than the connection, so a statement that raises leaves nothing behind
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.statement_seconds += elapsed
+    with _lock:
+        _totals["statements"] += 1
+        _totals["statement_seconds"] += elapsed
+    if SLOW_QUERY_MS is not None and elapsed * 1000 >= SLOW_QUERY_MS and not conn.info.get("explaining"):
+        _record_slow_query(conn, statement, parameters, executemany, elapsed)
+
+
+def _record_slow_query(conn, statement, parameters, executemany, elapsed):
+    plan = None
+    if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")):
+        # A fresh cursor: the statement's own cursor still holds its unread rows
+        conn.info["explaining"] = True
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+            plan = [row[-1] for row in cursor.fetchall()]
+        except Exception as exc:     # the plan is best effort; never fail the query over it
+            plan = [f"(EXPLAIN failed: {exc})"]
+        finally:
+            cursor.close()
+            conn.info["explaining"] = False
+    entry = {
+        "at": time.time(),
+        "ms": round(elapsed * 1000, 2),
+        "statement": " ".join(statement.split()),
+        "parameters": None if executemany else repr(parameters)[:500],
+        "plan": plan,
+    }
+    with _lock:
+        _totals["slow_statements"] += 1
+        slow_queries.append(entry)
+    slow_query_log.warning("%.1f ms: %s\n  plan: %s", entry["ms"], entry["statement"], "; ".join(plan or ["-"]))
+
+
+def instrument(engine):
+    """Count and time every statement run through engine (a sync Engine or AsyncEngine.sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """Times each request and counts its bytes and SQL statements. Add it last, so it
+    runs outermost and sees the compressed size."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = _RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status, size, finished = 500, 0, None
+
+        async def measuring_send(message):
+            nonlocal status, size, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                if not message.get("more_body"):
+                    # Background tasks run after this; they aren't the client's wait
+                    finished = (time.perf_counter(), stats.statements, stats.statement_seconds)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, measuring_send)
+        finally:
+            _current.reset(token)
+            end, statements, statement_seconds = finished or (time.perf_counter(), stats.statements, stats.statement_seconds)
+            elapsed = end - started
+            # FastAPI records the matched route; unmatched paths share one label to bound cardinality
+            route = getattr(scope.get("route"), "path", None) or "<other>"
+            method = scope["method"]
+            with _lock:
+                request_latency.observe((method, route, str(status)), elapsed)
+                response_size.observe((method, route), size)
+                request_statements.observe((method, route), statements)
+                request_statement_time.observe((method, route), statement_seconds)
+
+
+def totals() -> dict:
+    """Process-wide statement count, statement seconds and slow statements so far."""
+    with _lock:
+        return dict(_totals)
+
+
+def render() -> str:
+    """Every metric in the Prometheus text exposition format."""
+    with _lock:
+        lines = request_latency.render(("method", "route", "status"))
+        for histogram in (response_size, request_statements, request_statement_time):
+            lines += histogram.render(("method", "route"))
+        lines += [
+            "# HELP db_statements_total SQL statements executed.",
+            "# TYPE db_statements_total counter",
+            f"db_statements_total {_totals['statements']}",
+            "# HELP db_statement_seconds_total Time spent executing SQL.",
+            "# TYPE db_statement_seconds_total counter",
+            f"db_statement_seconds_total {_totals['statement_seconds']}",
+            "# HELP db_slow_statements_total Statements slower than SLOW_QUERY_MS.",
+            "# TYPE db_slow_statements_total counter",
+            f"db_slow_statements_total {_totals['slow_statements']}",
+        ]
+    return "\n".join(lines) + "\n"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, Text, Table, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, Text, Table, Date, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -6,8 +6,11 @@ Base = declarative_base()
 
 # Define association tables for many-to-many relationships
 meal_ingredients_association_table = Table('Meal_Ingredients', Base.metadata,
-    Column('meal_id', Integer, ForeignKey('Meals.meal_id')),
-    Column('ingredient_id', Integer, ForeignKey('Ingredients.ingredient_id'))
+    Column('meal_id', Integer, ForeignKey('Meals.meal_id'), index=True),
+    Column('ingredient_id', Integer, ForeignKey('Ingredients.ingredient_id'), index=True),
+    # How much of the ingredient this recipe uses
+    Column('quantity', Float),
+    Column('unit', String(50)),
 )
 
 class Meal(Base):
@@ -16,7 +19,7 @@ class Meal(Base):
     meal_id = Column(Integer, primary_key=True)
     name = Column(String(100))
     description = Column(Text)
-    cuisine_type = Column(String(50))
+    cuisine_type = Column(String(50), index=True)
     cooking_mode = Column(String(50))  # e.g., stove, oven
     cooking_ease = Column(String(50))
     cooking_time = Column(Integer)      # in minutes
@@ -35,9 +38,8 @@ class Ingredient(Base):
     __tablename__ = 'Ingredients'
 
     ingredient_id = Column(Integer, primary_key=True)
-    name = Column(String(100))
-    quantity = Column(Float)
-    unit = Column(String(50))
+    name = Column(String(100), index=True)             # as first entered, for display
+    canonical_name = Column(String(100), index=True, unique=True)  # see ingredients.normalize
 
     meals = relationship("Meal", secondary=meal_ingredients_association_table, back_populates="ingredients")
 
@@ -63,16 +65,34 @@ class Image(Base):
     __tablename__ = 'Images'
 
     image_id = Column(Integer, primary_key=True)
-    meal_id = Column(Integer, ForeignKey('Meals.meal_id'))
-    path = Column(Text)
-    # Other image fields
+    meal_id = Column(Integer, ForeignKey('Meals.meal_id'), index=True)
+    path = Column(Text, index=True)     # card_images looks variants up by path
+    # Content-addressed uploads: identical pictures share one file and one set of variants
+    content_hash = Column(String, index=True)
+    thumb_path = Column(Text)
+    card_path = Column(Text)
 
 class LogEntry(Base):
     __tablename__ = 'LogEntries'
 
     log_entry_id = Column(Integer, primary_key=True)
     meal_id = Column(Integer, ForeignKey('Meals.meal_id'))
-    date = Column(Text)
+    date = Column(Date, index=True)     # stored as ISO text; see log_dates.py
     rating = Column(Integer, nullable=True)
     notes = Column(Text)
     # Other log entry fields
+
+    # A meal's log in date order, and its last cooked date, are seeks on this
+    __table_args__ = (Index('ix_LogEntries_meal_id_date', 'meal_id', 'date'),)
+
+
+class MealStat(Base):
+    """Per-meal summary of LogEntries, kept current by meal_stats.py on every log write."""
+    __tablename__ = 'MealStats'
+
+    meal_id = Column(Integer, ForeignKey('Meals.meal_id'), primary_key=True)
+    first_meal_date = Column(Date)
+    recent_meal_date = Column(Date, index=True)   # analytics: longest since last cooked
+    meal_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)     # over ratings > 0 only
+    rating_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,259 @@
+"""Pantry matching: rank meals by how much of their ingredient list is already on hand.
+
+The Meal_Ingredients links are held as a sparse ingredient x meal matrix in CSR form:
+row i lists the positions of the meals that use ingredient i. Scoring a pantry is then
+a sparse vector-matrix product: the pantry's rows are concatenated and np.bincount
+counts, for every meal at once, how many of its ingredients are available. Meal
+attributes used as filters sit in parallel arrays. No Python loop runs per meal;
+only the returned page is looked up in the database.
+
+When the data version moves only the meals written since are re-read (data_version
+knows which). Most writes (a log entry, a rename, an image) leave a meal's links and
+filter attributes as they were; the matrix is then kept and just re-tagged. Otherwise
+it is reassembled in numpy from the links it already holds plus the changed meals'.
+Only a write that didn't name its meals (bulk import) costs the two full table scans.
+"""
+from dataclasses import dataclass, replace
+from itertools import chain
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Meal, Ingredient, meal_ingredients_association_table
+from cache import data_version
+from ingredients import normalize
+from images import card_images
+
+
+@dataclass(frozen=True)
+class _Matrix:
+    version: int
+    meal_ids: np.ndarray        # sorted; a meal's position in every per-meal array
+    totals: np.ndarray          # ingredients per meal
+    cooking_time: np.ndarray    # float, NaN when unknown
+    modes: np.ndarray           # sorted distinct cooking modes ("" for none)
+    mode_codes: np.ndarray      # per meal, index into modes
+    ingredient_ids: np.ndarray  # sorted; row i of the matrix is ingredient_ids[i]
+    indptr: np.ndarray          # row i is indices[indptr[i]:indptr[i + 1]]
+    indices: np.ndarray         # meal positions
+    rows: np.ndarray            # the row (ingredient) of each entry in indices
+    # The same links ordered by meal, then ingredient, for comparing a changed meal's
+    link_meals: np.ndarray
+    link_ingredients: np.ndarray
+
+
+def _assemble(version, meal_ids, cooking_time, mode_names, link_meals, link_ingredients) -> _Matrix:
+    """The matrix for meals sorted by id and their links sorted by meal_id, then ingredient_id."""
+    positions = np.searchsorted(meal_ids, link_meals)
+    # Drop links to meals deleted between the two reads
+    found = positions < len(meal_ids)
+    found[found] = meal_ids[positions[found]] == link_meals[found]
+    if not found.all():
+        link_meals, link_ingredients, positions = link_meals[found], link_ingredients[found], positions[found]
+
+    order = np.argsort(link_ingredients, kind="stable")
+    ingredient_ids, starts, counts = np.unique(link_ingredients[order], return_index=True, return_counts=True)
+    # Back to a str array sized for the longest name (the incremental path passes objects)
+    modes, mode_codes = np.unique(np.asarray(mode_names).astype(str), return_inverse=True)
+    return _Matrix(
+        version=version,
+        meal_ids=meal_ids,
+        totals=np.bincount(positions, minlength=len(meal_ids)),
+        cooking_time=cooking_time,
+        modes=modes,
+        mode_codes=mode_codes,
+        ingredient_ids=ingredient_ids,
+        indptr=np.append(starts, len(order)),
+        indices=positions[order],
+        rows=np.repeat(np.arange(len(ingredient_ids)), counts),
+        link_meals=link_meals,
+        link_ingredients=link_ingredients,
+    )
+
+
+def _ids_param(meal_ids) -> str:
+    return "[" + ",".join(str(int(i)) for i in meal_ids) + "]"
+
+
+def _read_meals(conn, meal_ids=None):
+    """(meal_ids, cooking_time, mode names) arrays, sorted by meal_id."""
+    query = select(Meal.meal_id, Meal.cooking_time, Meal.cooking_mode).order_by(Meal.meal_id)
+    if meal_ids is not None:
+        query = query.where(Meal.meal_id.in_(meal_ids))
+    meals = conn.execute(query).all()
+    return (
+        np.array([m.meal_id for m in meals], dtype=np.int64),
+        np.array([np.nan if m.cooking_time is None else m.cooking_time for m in meals], dtype=float),
+        np.array([m.cooking_mode or "" for m in meals], dtype=str),
+    )
+
+
+def _read_links(conn, meal_ids=None):
+    """(meal_ids, ingredient_ids) arrays of Meal_Ingredients rows, ordered by meal then ingredient."""
+    sql, params = "SELECT meal_id, ingredient_id FROM Meal_Ingredients WHERE meal_id IS NOT NULL", ()
+    if meal_ids is not None:
+        sql, params = sql + " AND meal_id IN (SELECT value FROM json_each(?))", (_ids_param(meal_ids),)
+    # A million links is normal here; plain DBAPI tuples skip building a Row for each
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(sql + " ORDER BY meal_id, ingredient_id", params)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    links = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=2 * len(rows)).reshape(-1, 2)
+    return links[:, 0], links[:, 1]
+
+
+class PantryMatcher:
+
+    # Beyond this many changed meals one full scan is cheaper than IN queries
+    MAX_INCREMENTAL = 2000
+
+    def __init__(self):
+        self._matrix = None
+
+    def _build(self, db: Session, version: int) -> _Matrix:
+        conn = db.connection()
+        return _assemble(version, *_read_meals(conn), *_read_links(conn))
+
+    def _update(self, db: Session, m: _Matrix, version: int, changed) -> _Matrix:
+        conn = db.connection()
+        ids = np.array(sorted(changed), dtype=np.int64)
+        meal_ids, cooking_time, mode_names = _read_meals(conn, ids.tolist())
+        link_meals, link_ingredients = _read_links(conn, ids.tolist())
+
+        positions = np.searchsorted(m.meal_ids, ids)
+        known = positions < len(m.meal_ids)
+        known[known] = m.meal_ids[positions[known]] == ids[known]
+        positions = positions[known]
+        stored_links = np.isin(m.link_meals, ids)
+        if (np.array_equal(meal_ids, ids[known])
+                and np.array_equal(cooking_time, m.cooking_time[positions], equal_nan=True)
+                and np.array_equal(mode_names, m.modes[m.mode_codes[positions]])
+                and np.array_equal(link_meals, m.link_meals[stored_links])
+                and np.array_equal(link_ingredients, m.link_ingredients[stored_links])):
+            # Nothing the matrix holds changed (a log entry, a rename, an image)
+            return replace(m, version=version)
+
+        # Swap the changed meals' rows and links for the fresh ones, keeping both sorted
+        kept = ~np.isin(m.meal_ids, ids)
+        kept_ids = m.meal_ids[kept]
+        at = np.searchsorted(kept_ids, meal_ids)
+        kept_links = m.link_meals[~stored_links]
+        link_at = np.searchsorted(kept_links, link_meals)
+        return _assemble(
+            version,
+            np.insert(kept_ids, at, meal_ids),
+            np.insert(m.cooking_time[kept], at, cooking_time),
+            # As objects: inserting into the fixed-width str array would cut longer new names short
+            np.insert(m.modes[m.mode_codes[kept]].astype(object), at, mode_names),
+            np.insert(kept_links, link_at, link_meals),
+            np.insert(m.link_ingredients[~stored_links], link_at, link_ingredients),
+        )
+
+    def matrix(self, db: Session) -> _Matrix:
+        # Read the version first: a write landing mid-build leaves the matrix tagged stale
+        m, version = self._matrix, data_version.value
+        if m is not None and m.version == version:
+            return m
+        changed = None if m is None else data_version.changed_since(m.version)
+        if changed is None or len(changed) > self.MAX_INCREMENTAL:
+            fresh = self._build(db, version)
+        else:
+            fresh = self._update(db, m, version, changed)
+        # Concurrent refreshes each produce a consistent matrix; keep the first one swapped in
+        if self._matrix is m:
+            self._matrix = fresh
+        return fresh
+
+    def rank(self, db: Session, have, max_time=None, cooking_mode=None, min_coverage=0.0,
+             max_missing=None, limit=20):
+        """Rank the meals for a pantry. Returns [(meal_id, matched, total)], best first.
+
+        Meals are ordered by coverage (the fraction of their ingredients in have), then
+        fewest missing, then meal_id. Only meals with at least one ingredient on hand count.
+        """
+        m = self.matrix(db)
+        pantry = list({normalize(name) for name in have})
+        wanted = np.array(db.connection().execute(
+            select(Ingredient.ingredient_id).where(Ingredient.canonical_name.in_(pantry))
+        ).scalars().all(), dtype=np.int64)
+        rows = np.searchsorted(m.ingredient_ids, wanted)
+        linked = rows < len(m.ingredient_ids)   # ingredients no meal uses have no row
+        linked[linked] = m.ingredient_ids[rows[linked]] == wanted[linked]
+        hits = [m.indices[m.indptr[r]:m.indptr[r + 1]] for r in rows[linked]]
+        if not hits:
+            return []
+        matched = np.bincount(np.concatenate(hits), minlength=len(m.meal_ids))
+
+        keep = (matched > 0) & (matched >= min_coverage * m.totals)
+        if max_missing is not None:
+            keep &= (m.totals - matched) <= max_missing
+        if max_time is not None:
+            keep &= m.cooking_time <= max_time
+        if cooking_mode:
+            code = np.searchsorted(m.modes, cooking_mode)
+            if code == len(m.modes) or m.modes[code] != cooking_mode:
+                return []
+            keep &= m.mode_codes == code
+        candidates = np.flatnonzero(keep)
+        coverage = matched[candidates] / m.totals[candidates]
+        if len(candidates) > limit:
+            # Only meals at least as covered as the limit-th best can make the page
+            cutoff = -np.partition(-coverage, limit - 1)[limit - 1]
+            near = coverage >= cutoff
+            candidates, coverage = candidates[near], coverage[near]
+        missing = m.totals[candidates] - matched[candidates]
+        order = np.lexsort((m.meal_ids[candidates], missing, -coverage))[:limit]
+        best = candidates[order]
+        return list(zip(m.meal_ids[best].tolist(), matched[best].tolist(), m.totals[best].tolist()))
+
+
+pantry_matcher = PantryMatcher()
+
+
+def match_meals(db: Session, have, max_time=None, cooking_mode=None, min_coverage=0.0,
+                max_missing=None, limit=20) -> list[dict]:
+    """The best matching meals for a pantry, as dicts in schemas.MealMatch's shape."""
+    ranked = pantry_matcher.rank(db, have, max_time, cooking_mode, min_coverage, max_missing, limit)
+    if not ranked:
+        return []
+    meal_ids = [meal_id for meal_id, _, _ in ranked]
+    meals = {
+        m.meal_id: m for m in db.connection().execute(
+            select(Meal.meal_id, Meal.name, Meal.cuisine_type, Meal.cooking_mode, Meal.cooking_time, Meal.image_path)
+            .where(Meal.meal_id.in_(meal_ids))
+        )
+    }
+    assoc = meal_ingredients_association_table
+    pantry = {normalize(name) for name in have}
+    missing = {meal_id: [] for meal_id in meal_ids}
+    for meal_id, name, canonical_name in db.connection().execute(
+        select(assoc.c.meal_id, Ingredient.name, Ingredient.canonical_name)
+        .join(Ingredient, Ingredient.ingredient_id == assoc.c.ingredient_id)
+        .where(assoc.c.meal_id.in_(meal_ids))
+    ):
+        if canonical_name not in pantry:
+            missing[meal_id].append(name)
+    cards = card_images(db, {m.image_path for m in meals.values()})
+
+    results = []
+    for meal_id, matched, total in ranked:
+        meal = meals.get(meal_id)
+        if meal is None:
+            continue
+        results.append({
+            "meal_id": meal_id,
+            "name": meal.name,
+            "cuisine_type": meal.cuisine_type,
+            "cooking_mode": meal.cooking_mode,
+            "cooking_time": meal.cooking_time,
+            "image_path": meal.image_path,
+            "card_image_path": cards.get(meal.image_path),
+            "coverage": matched / total,
+            "matched_count": matched,
+            "missing_count": total - matched,
+            "missing": missing[meal_id],
+        })
+    return results
@@ -0,0 +1,155 @@
+"""Meal plans: one meal per day for a date range, under constraints.
+
+A plan maximizes the sum of the meals' recommendation scores (recommendations.py:
+rating, time since last cooked, cuisine variety, ingredient taste), plus a bonus
+for the preferred cooking_ease, subject to:
+
+- no meal twice, and no cuisine again within cuisine_gap days, counting what the
+  cooking history says was eaten just before the plan starts
+- every meal at most max_time minutes, and all of them together at most max_total_time
+
+The constraints only look at a meal's cuisine and cooking time, so a plan of N days
+never needs more than the N best meals of each cuisine, plus the N best that fit an
+even share of the time budget. That pool (a few hundred meals even with thousands to
+choose from) is searched day by day with a beam search: the BEAM_WIDTH best partial
+plans are extended with every allowed meal, with the time budget checked against the
+fastest meals still available, and the best BEAM_WIDTH are kept.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Meal
+from recommendations import score_meals
+from images import card_images
+from shopping import shopping_list
+
+
+BEAM_WIDTH = 64
+EASE_BONUS = 0.1
+
+
+def _top_per_cuisine(candidates, utility, cuisine, n):
+    """The n highest-utility candidates of each cuisine (meals without one count as one cuisine)."""
+    if not len(candidates):
+        return candidates
+    order = candidates[np.lexsort((-utility[candidates], cuisine[candidates]))]
+    groups = cuisine[order]
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    return order[rank < n]
+
+
+def _search(utility, cuisine, time, days, cuisine_gap, history, budget):
+    """Beam search over pool positions. Returns the best plan as a list of positions, or None.
+
+    history maps days before the start (-1 = the day before) to the cuisines eaten then.
+    """
+    fastest = np.cumsum(np.r_[0.0, np.sort(time)])     # least time any k meals can take
+    # Cuisine codes shifted by one so "no cuisine" (-1) indexes slot 0, which is never blocked
+    blocked = np.zeros(cuisine.max(initial=-1) + 2, dtype=bool)
+    beam = [(0.0, 0.0, ())]
+    for day in range(days):
+        recent = set()
+        for offset, cuisines in history.items():
+            if offset >= day - cuisine_gap:
+                recent |= cuisines
+        extended = {}
+        for total, spent, chosen in beam:
+            allowed = np.ones(len(utility), dtype=bool)
+            allowed[list(chosen)] = False
+            blocked[:] = False
+            blocked[[c + 1 for c in recent if c + 1 < len(blocked)]] = True
+            blocked[cuisine[list(chosen[max(0, day - cuisine_gap):])] + 1] = True
+            blocked[0] = False
+            allowed &= ~blocked[cuisine + 1]
+            if budget is not None:
+                rest = days - day - 1
+                allowed &= spent + time + fastest[min(rest, len(fastest) - 1)] <= budget
+            options = np.flatnonzero(allowed)
+            if len(options) > BEAM_WIDTH:
+                options = options[np.argpartition(-utility[options], BEAM_WIDTH - 1)[:BEAM_WIDTH]]
+            for p in options.tolist():
+                plan = chosen + (p,)
+                # Two orderings of the same meals are the same state once the gap has passed
+                key = (frozenset(plan), plan[max(0, len(plan) - cuisine_gap):])
+                score = total + utility[p]
+                if key not in extended or extended[key][0] < score:
+                    extended[key] = (score, spent + time[p], plan)
+        if not extended:
+            return None
+        beam = sorted(extended.values(), key=lambda state: state[0], reverse=True)[:BEAM_WIDTH]
+    return list(beam[0][2])
+
+
+def plan_meals(db: Session, start: date, days: int = 7, cuisine_gap: int = 2, max_time=None,
+               max_total_time=None, cooking_ease=None):
+    """Plan a meal for each of days days from start, as a dict in schemas.MealPlan's shape.
+
+    Returns None when no plan satisfies the constraints.
+    """
+    f, _, total = score_meals(db, start)
+    utility = total.copy()
+    if cooking_ease in f.eases:
+        utility[f.ease == f.eases.index(cooking_ease)] += EASE_BONUS
+
+    keep = f.active.copy()
+    if max_time is not None:
+        keep &= f.cooking_time <= max_time
+    if max_total_time is not None:
+        keep &= f.cooking_time <= max_total_time
+    candidates = np.flatnonzero(keep)
+    pool = _top_per_cuisine(candidates, utility, f.cuisine, days)
+    if max_total_time is not None:
+        thrifty = candidates[f.cooking_time[candidates] <= max_total_time / days]
+        pool = np.union1d(pool, _top_per_cuisine(thrifty, utility, f.cuisine, days))
+    if len(pool) < days:
+        return None
+
+    # Cuisines eaten in the cuisine_gap days before start, by day offset (-1 = the day before)
+    history = {}
+    start_day = start.toordinal()
+    for i in np.flatnonzero(f.active & (f.last_day >= start_day - cuisine_gap) & (f.last_day < start_day)):
+        history.setdefault(int(f.last_day[i]) - start_day, set()).add(int(f.cuisine[i]))
+
+    time = np.nan_to_num(f.cooking_time[pool])
+    plan = _search(utility[pool], f.cuisine[pool], time, days, cuisine_gap, history, max_total_time)
+    if plan is None:
+        return None
+
+    chosen = pool[plan]
+    meal_ids = f.meal_ids[chosen].tolist()
+    meals = {
+        m.meal_id: m for m in db.connection().execute(
+            select(Meal.meal_id, Meal.name, Meal.cuisine_type, Meal.cooking_mode, Meal.cooking_ease,
+                   Meal.cooking_time, Meal.image_path)
+            .where(Meal.meal_id.in_(meal_ids))
+        )
+    }
+    cards = card_images(db, {m.image_path for m in meals.values()})
+    planned = []
+    for day, (i, meal_id) in enumerate(zip(chosen.tolist(), meal_ids)):
+        meal = meals.get(meal_id)
+        if meal is None:
+            continue
+        planned.append({
+            "date": start + timedelta(days=day),
+            "meal_id": meal_id,
+            "name": meal.name,
+            "cuisine_type": meal.cuisine_type,
+            "cooking_mode": meal.cooking_mode,
+            "cooking_ease": meal.cooking_ease,
+            "cooking_time": meal.cooking_time,
+            "image_path": meal.image_path,
+            "card_image_path": cards.get(meal.image_path),
+            "score": float(utility[i]),
+        })
+    return {
+        "start": start,
+        "end": start + timedelta(days=days - 1),
+        "meals": planned,
+        "total_cooking_time": sum(m["cooking_time"] or 0 for m in planned),
+        "shopping_list": shopping_list(db, meal_ids),
+    }
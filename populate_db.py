@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine
+from datetime import date
+
+from sqlalchemy import create_engine, insert
 from sqlalchemy.orm import sessionmaker, Session
-from models import Base, Meal, Ingredient, Direction, Rating, Image, LogEntry
+from models import Base, Meal, Ingredient, Direction, Rating, Image, LogEntry, meal_ingredients_association_table
+from ingredients import normalize
 
 DATABASE_URL = "sqlite:///data/meal_tracker.db"
 engine = create_engine(DATABASE_URL)
@@ -68,27 +71,36 @@ def populate_db():
         db.commit()
 
         # Create some sample ingredients
-        ing1 = Ingredient(name="Spaghetti", quantity=400, unit="grams")
-        ing2 = Ingredient(name="Pancetta", quantity=150, unit="grams")
-        ing3 = Ingredient(name="Eggs", quantity=4, unit="whole")
-        ing4 = Ingredient(name="Parmesan Cheese", quantity=100, unit="grams")
-        ing5 = Ingredient(name="Chicken Breast", quantity=500, unit="grams")
-        ing6 = Ingredient(name="Heavy Cream", quantity=250, unit="ml")
-        ing7 = Ingredient(name="Ground Beef", quantity=500, unit="grams")
-        ing8 = Ingredient(name="Taco Shells", quantity=12, unit="pieces")
-        ing9 = Ingredient(name="Salmon Fillet", quantity=600, unit="grams")
-        ing10 = Ingredient(name="Mixed Vegetables", quantity=500, unit="grams")
-        ing11 = Ingredient(name="Soy Sauce", quantity=3, unit="tbsp")
-
+        ing1 = Ingredient(name="Spaghetti", canonical_name=normalize("Spaghetti"))
+        ing2 = Ingredient(name="Pancetta", canonical_name=normalize("Pancetta"))
+        ing3 = Ingredient(name="Eggs", canonical_name=normalize("Eggs"))
+        ing4 = Ingredient(name="Parmesan Cheese", canonical_name=normalize("Parmesan Cheese"))
+        ing5 = Ingredient(name="Chicken Breast", canonical_name=normalize("Chicken Breast"))
+        ing6 = Ingredient(name="Heavy Cream", canonical_name=normalize("Heavy Cream"))
+        ing7 = Ingredient(name="Ground Beef", canonical_name=normalize("Ground Beef"))
+        ing8 = Ingredient(name="Taco Shells", canonical_name=normalize("Taco Shells"))
+        ing9 = Ingredient(name="Salmon Fillet", canonical_name=normalize("Salmon Fillet"))
+        ing10 = Ingredient(name="Mixed Vegetables", canonical_name=normalize("Mixed Vegetables"))
+        ing11 = Ingredient(name="Soy Sauce", canonical_name=normalize("Soy Sauce"))
         db.add_all([ing1, ing2, ing3, ing4, ing5, ing6, ing7, ing8, ing9, ing10, ing11])
         db.commit()
 
-        # Associate ingredients with meals
-        meal1.ingredients.extend([ing1, ing2, ing3, ing4])
-        meal2.ingredients.extend([ing1, ing5, ing6, ing4])
-        meal3.ingredients.extend([ing7, ing8])
-        meal4.ingredients.append(ing9)
-        meal5.ingredients.extend([ing10, ing11])
+        # Associate ingredients with meals; the amounts are per recipe
+        db.execute(insert(meal_ingredients_association_table), [
+            {"meal_id": meal1.meal_id, "ingredient_id": ing1.ingredient_id, "quantity": 400, "unit": "grams"},
+            {"meal_id": meal1.meal_id, "ingredient_id": ing2.ingredient_id, "quantity": 150, "unit": "grams"},
+            {"meal_id": meal1.meal_id, "ingredient_id": ing3.ingredient_id, "quantity": 4, "unit": "whole"},
+            {"meal_id": meal1.meal_id, "ingredient_id": ing4.ingredient_id, "quantity": 100, "unit": "grams"},
+            {"meal_id": meal2.meal_id, "ingredient_id": ing1.ingredient_id, "quantity": 400, "unit": "grams"},
+            {"meal_id": meal2.meal_id, "ingredient_id": ing5.ingredient_id, "quantity": 500, "unit": "grams"},
+            {"meal_id": meal2.meal_id, "ingredient_id": ing6.ingredient_id, "quantity": 250, "unit": "ml"},
+            {"meal_id": meal2.meal_id, "ingredient_id": ing4.ingredient_id, "quantity": 100, "unit": "grams"},
+            {"meal_id": meal3.meal_id, "ingredient_id": ing7.ingredient_id, "quantity": 500, "unit": "grams"},
+            {"meal_id": meal3.meal_id, "ingredient_id": ing8.ingredient_id, "quantity": 12, "unit": "pieces"},
+            {"meal_id": meal4.meal_id, "ingredient_id": ing9.ingredient_id, "quantity": 600, "unit": "grams"},
+            {"meal_id": meal5.meal_id, "ingredient_id": ing10.ingredient_id, "quantity": 500, "unit": "grams"},
+            {"meal_id": meal5.meal_id, "ingredient_id": ing11.ingredient_id, "quantity": 3, "unit": "tbsp"},
+        ])
 
         db.commit()
 
@@ -118,13 +130,13 @@ def populate_db():
         db.commit()
 
         # Add log entries
-        LogEntry(meal=meal1, date="2024-12-01", rating=5, notes="Delicious! Made for dinner.")
-        LogEntry(meal=meal1, date="2024-11-15", rating=5, notes="Family favorite.")
-        LogEntry(meal=meal2, date="2024-12-10", rating=4, notes="Good but a bit heavy.")
-        LogEntry(meal=meal3, date="2024-12-05", rating=5, notes="Quick and tasty!")
-        LogEntry(meal=meal3, date="2024-11-20", rating=4, notes="Kids loved it.")
-        LogEntry(meal=meal4, date="2024-12-08", rating=5, notes="Perfectly cooked salmon.")
-        LogEntry(meal=meal5, date="2024-12-12", rating=4, notes="Healthy and quick weeknight meal.")
+        LogEntry(meal=meal1, date=date(2024, 12, 1), rating=5, notes="Delicious! Made for dinner.")
+        LogEntry(meal=meal1, date=date(2024, 11, 15), rating=5, notes="Family favorite.")
+        LogEntry(meal=meal2, date=date(2024, 12, 10), rating=4, notes="Good but a bit heavy.")
+        LogEntry(meal=meal3, date=date(2024, 12, 5), rating=5, notes="Quick and tasty!")
+        LogEntry(meal=meal3, date=date(2024, 11, 20), rating=4, notes="Kids loved it.")
+        LogEntry(meal=meal4, date=date(2024, 12, 8), rating=5, notes="Perfectly cooked salmon.")
+        LogEntry(meal=meal5, date=date(2024, 12, 12), rating=4, notes="Healthy and quick weeknight meal.")
 
         db.commit()
 
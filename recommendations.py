@@ -0,0 +1,247 @@
+"""Meal recommendations scored from cooking history, with vectorized NumPy.
+
+Every meal gets four component scores, each in [0, 1]:
+
+- rating: its average rating / 5 (unrated meals get the average of the rated ones)
+- recency: 1 - 0.5 ** (days since last cooked / RECENCY_HALF_LIFE); never cooked = 1
+- variety: 1 - the share of recently cooked meals that were the same cuisine
+- similarity: cosine similarity between its ingredients and a taste profile, the
+  ingredients of everything cooked, weighted by times cooked and rating
+
+The per-meal inputs (rating, last cooked day, times cooked, cuisine, cooking time)
+come from the MealStats table into a feature matrix held in memory. When the data
+version moves, only the meals written since are re-read. Ingredient links come from
+the pantry matrix (pantry.py), which is refreshed the same way and left as it is
+when a write (such as a new log entry) didn't change any links. No request scans
+LogEntries or Meal_Ingredients.
+"""
+from dataclasses import dataclass, replace
+from datetime import date
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from cache import data_version
+from pantry import pantry_matcher
+from images import card_images
+
+
+WEIGHTS = {"rating": 0.4, "recency": 0.3, "variety": 0.15, "similarity": 0.15}
+RECENCY_HALF_LIFE = 21      # days
+RECENT_WINDOW = 14          # days of cooking that count against a cuisine's variety
+MAX_INCREMENTAL = 2000      # changed meals beyond which a full reload is cheaper
+
+_FEATURES_SQL = """
+    SELECT m.meal_id, m.cuisine_type, m.cooking_ease, m.cooking_time,
+           s.recent_meal_date, s.meal_count, s.rating_sum, s.rating_count
+    FROM Meals m LEFT JOIN MealStats s ON s.meal_id = m.meal_id
+"""
+
+
+def _day(value):
+    """Day number of a 'YYYY-MM-DD' string or date, NaN when missing or malformed."""
+    if value is None:
+        return np.nan
+    try:
+        return (value if isinstance(value, date) else date.fromisoformat(str(value))).toordinal()
+    except ValueError:
+        return np.nan
+
+
+@dataclass(frozen=True)
+class _Features:
+    version: int
+    meal_ids: np.ndarray        # sorted; row i describes meal_ids[i]
+    active: np.ndarray          # False for rows whose meal was deleted
+    avg_rating: np.ndarray      # NaN when never rated
+    last_day: np.ndarray        # day number last cooked, NaN when never
+    times_cooked: np.ndarray
+    cooking_time: np.ndarray    # NaN when unknown
+    cuisine: np.ndarray         # index into cuisines, -1 for none
+    cuisines: tuple
+    ease: np.ndarray            # index into eases, -1 for none
+    eases: tuple
+
+
+def _encode(values, labels: list) -> np.ndarray:
+    """Index of each value in labels (appending new ones), -1 for None."""
+    codes = {label: i for i, label in enumerate(labels)}
+    encoded = np.empty(len(values), dtype=np.int64)
+    for i, value in enumerate(values):
+        if value is None:
+            encoded[i] = -1
+        else:
+            if value not in codes:
+                codes[value] = len(labels)
+                labels.append(value)
+            encoded[i] = codes[value]
+    return encoded
+
+
+def _rows_to_arrays(rows, cuisines: list, eases: list):
+    return {
+        "meal_ids": np.array([r.meal_id for r in rows], dtype=np.int64),
+        "active": np.ones(len(rows), dtype=bool),
+        "avg_rating": np.array([r.rating_sum / r.rating_count if r.rating_count else np.nan for r in rows], dtype=float),
+        "last_day": np.array([_day(r.recent_meal_date) for r in rows], dtype=float),
+        "times_cooked": np.array([r.meal_count or 0 for r in rows], dtype=float),
+        "cooking_time": np.array([np.nan if r.cooking_time is None else r.cooking_time for r in rows], dtype=float),
+        "cuisine": _encode([r.cuisine_type for r in rows], cuisines),
+        "ease": _encode([r.cooking_ease for r in rows], eases),
+    }
+
+
+class MealFeatures:
+    """The per-meal feature matrix, refreshed for just the meals that changed."""
+
+    def __init__(self):
+        self._features = None
+
+    def _load(self, db: Session, version: int) -> _Features:
+        rows = db.connection().execute(text(_FEATURES_SQL + " ORDER BY m.meal_id")).all()
+        cuisines, eases = [], []
+        arrays = _rows_to_arrays(rows, cuisines, eases)
+        return _Features(version=version, cuisines=tuple(cuisines), eases=tuple(eases), **arrays)
+
+    def _update(self, db: Session, f: _Features, version: int, changed) -> _Features:
+        ids = "[" + ",".join(str(int(i)) for i in changed) + "]"
+        rows = db.connection().execute(text(
+            _FEATURES_SQL + " WHERE m.meal_id IN (SELECT value FROM json_each(:ids)) ORDER BY m.meal_id"
+        ), {"ids": ids}).all()
+        cuisines, eases = list(f.cuisines), list(f.eases)
+        fresh = _rows_to_arrays(rows, cuisines, eases)
+        arrays = {name: getattr(f, name).copy() for name in fresh}
+
+        # Changed meals that no longer exist are switched off
+        gone = np.setdiff1d(np.fromiter(changed, dtype=np.int64), fresh["meal_ids"])
+        arrays["active"][np.isin(f.meal_ids, gone)] = False
+
+        positions = np.searchsorted(f.meal_ids, fresh["meal_ids"])
+        known = positions < len(f.meal_ids)
+        known[known] = f.meal_ids[positions[known]] == fresh["meal_ids"][known]
+        for name, values in fresh.items():
+            arrays[name][positions[known]] = values[known]
+        if not known.all():
+            # New meals: ids only grow, but merge by sort to be safe
+            merged = {name: np.concatenate([arrays[name], values[~known]]) for name, values in fresh.items()}
+            order = np.argsort(merged["meal_ids"], kind="stable")
+            arrays = {name: values[order] for name, values in merged.items()}
+        return replace(f, version=version, cuisines=tuple(cuisines), eases=tuple(eases), **arrays)
+
+    def get(self, db: Session) -> _Features:
+        f, version = self._features, data_version.value
+        if f is not None and f.version == version:
+            return f
+        changed = None if f is None else data_version.changed_since(f.version)
+        if changed is None or len(changed) > MAX_INCREMENTAL:
+            fresh = self._load(db, version)
+        else:
+            fresh = self._update(db, f, version, changed)
+        # A concurrent refresh may have swapped in a newer one meanwhile; either is consistent
+        if self._features is f:
+            self._features = fresh
+        return fresh
+
+
+meal_features = MealFeatures()
+
+
+# Scores only change with the data or the date: (features version, day) -> (features, components, total)
+_scores = None
+
+
+def score_meals(db: Session, today: date = None):
+    """Component and total scores for every active meal: (features, {component: array}, total)."""
+    global _scores
+    f = meal_features.get(db)
+    today = (today or date.today()).toordinal()
+    if _scores is not None and _scores[0] == (f.version, today):
+        return _scores[1]
+
+    rated = f.avg_rating[f.active & ~np.isnan(f.avg_rating)]
+    prior = rated.mean() if len(rated) else 3.0
+    rating = np.where(np.isnan(f.avg_rating), prior, f.avg_rating) / 5
+
+    days_since = today - f.last_day
+    recency = np.where(np.isnan(days_since), 1.0, 1 - 0.5 ** (np.clip(days_since, 0, None) / RECENCY_HALF_LIFE))
+
+    recent = f.active & (days_since <= RECENT_WINDOW) & (f.cuisine >= 0)
+    variety = np.ones(len(f.meal_ids))
+    if recent.any():
+        share = np.bincount(f.cuisine[recent], minlength=len(f.cuisines)) / recent.sum()
+        has_cuisine = f.cuisine >= 0
+        variety[has_cuisine] = 1 - share[f.cuisine[has_cuisine]]
+
+    similarity = _ingredient_similarity(db, f, taste=f.times_cooked * rating * f.active)
+
+    components = {"rating": rating, "recency": recency, "variety": variety, "similarity": similarity}
+    total = sum(WEIGHTS[name] * values for name, values in components.items())
+    _scores = ((f.version, today), (f, components, total))
+    return f, components, total
+
+
+def _ingredient_similarity(db: Session, f: _Features, taste: np.ndarray) -> np.ndarray:
+    """Cosine similarity of each meal's ingredient set to the taste-weighted ingredient profile."""
+    m = pantry_matcher.matrix(db)
+    similarity = np.zeros(len(f.meal_ids))
+    if not len(m.indices) or not taste.any():
+        return similarity
+    # Line the feature rows up with the matrix's meal positions
+    positions = np.searchsorted(m.meal_ids, f.meal_ids)
+    linked = positions < len(m.meal_ids)
+    linked[linked] = m.meal_ids[positions[linked]] == f.meal_ids[linked]
+    weight = np.zeros(len(m.meal_ids))
+    weight[positions[linked]] = taste[linked]
+
+    profile = np.bincount(m.rows, weights=weight[m.indices], minlength=len(m.ingredient_ids))
+    dot = np.bincount(m.indices, weights=profile[m.rows], minlength=len(m.meal_ids))
+    norms = np.sqrt(m.totals) * np.linalg.norm(profile)
+    cosine = np.divide(dot, norms, out=np.zeros_like(dot), where=norms > 0)
+    similarity[linked] = cosine[positions[linked]]
+    return similarity
+
+
+def recommend(db: Session, limit: int = 10, cuisine_type=None, max_time=None, today: date = None) -> list[dict]:
+    """The top meals by total score, as dicts in schemas.MealRecommendation's shape."""
+    f, components, total = score_meals(db, today)
+    keep = f.active.copy()
+    if cuisine_type:
+        code = f.cuisines.index(cuisine_type) if cuisine_type in f.cuisines else -2
+        keep &= f.cuisine == code
+    if max_time is not None:
+        keep &= f.cooking_time <= max_time
+    candidates = np.flatnonzero(keep)
+    if len(candidates) > limit:
+        candidates = candidates[np.argpartition(-total[candidates], limit - 1)[:limit]]
+    best = candidates[np.lexsort((f.meal_ids[candidates], -total[candidates]))]
+    if not len(best):
+        return []
+
+    meal_ids = f.meal_ids[best].tolist()
+    meals = {
+        m.meal_id: m for m in db.connection().execute(text(
+            "SELECT meal_id, name, cuisine_type, cooking_mode, cooking_time, image_path FROM Meals "
+            "WHERE meal_id IN (SELECT value FROM json_each(:ids))"
+        ), {"ids": "[" + ",".join(map(str, meal_ids)) + "]"})
+    }
+    cards = card_images(db, {m.image_path for m in meals.values()})
+    today_number = (today or date.today()).toordinal()
+    results = []
+    for i in best:
+        meal = meals.get(int(f.meal_ids[i]))
+        if meal is None:
+            continue
+        results.append({
+            "meal_id": meal.meal_id,
+            "name": meal.name,
+            "cuisine_type": meal.cuisine_type,
+            "cooking_mode": meal.cooking_mode,
+            "cooking_time": meal.cooking_time,
+            "image_path": meal.image_path,
+            "card_image_path": cards.get(meal.image_path),
+            "days_since_cooked": None if np.isnan(f.last_day[i]) else int(today_number - f.last_day[i]),
+            "score": float(total[i]),
+            "components": {name: float(values[i]) for name, values in components.items()},
+        })
+    return results
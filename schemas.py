@@ -1,6 +1,6 @@
-from datetime import datetime, timedelta
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, Union, List
+from datetime import date, datetime, timedelta
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
+from typing import Optional, Union, List, Dict
 
 # Define Pydantic models for request/response bodies
 
@@ -23,17 +23,31 @@ class DirectionResponse(BaseModel):
 
 
 class LogEntryResponse(BaseModel):
-    date: str
+    log_entry_id: Optional[int] = None
+    date: Optional[date]        # required, but entries whose old text date couldn't be parsed hold None
     rating: Optional[int] = -1
     notes: Optional[str] = None
 
     class Config:
         orm_mode = True
 
+
+class LogEntryCreate(LogEntryResponse):
+    """A log entry as clients send it: only stored entries may lack a date."""
+
+    # A stored entry whose old date couldn't be parsed comes back from the form as
+    # null; it is kept as it is. A new entry still needs a date.
+    @model_validator(mode="after")
+    def date_required_when_new(self):
+        if self.date is None and self.log_entry_id is None:
+            raise ValueError("date is required for a new log entry")
+        return self
+
+
 class MealStats(BaseModel):
     meal_id: int
-    first_meal_date: Optional[str] = None
-    recent_meal_date: Optional[str] = None
+    first_meal_date: Optional[date] = None
+    recent_meal_date: Optional[date] = None
     meal_count: Optional[int] = 0
     avg_rating: Optional[float] = 0.0
 
@@ -49,7 +63,31 @@ class MealCreate(BaseModel):
     source_url: Optional[str] = None
     ingredients: Optional[List[IngredientResponse]] = []
     directions: Optional[List[DirectionResponse]] = []
-    log_entries: Optional[List[LogEntryResponse]] = []
+    log_entries: Optional[List[LogEntryCreate]] = []
+
+
+class MealPatch(BaseModel):
+    """Partial update: only the fields sent are changed; a list sent replaces that list."""
+    name: Optional[str] = None
+    description: Optional[str] = None
+    cuisine_type: Optional[str] = None
+    cooking_mode: Optional[str] = None
+    cooking_ease: Optional[str] = None
+    cooking_time: Optional[int] = None
+    image_path: Optional[str] = None
+    source_url: Optional[str] = None
+    ingredients: Optional[List[IngredientResponse]] = None
+    directions: Optional[List[DirectionResponse]] = None
+    log_entries: Optional[List[LogEntryCreate]] = None
+
+    # Left out, they stay unchanged; sent as null they would store NULL in columns
+    # MealResponse requires. Defaults aren't validated, so only an explicit null fails.
+    @field_validator("name", "description")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("may be left out but not null")
+        return value
 
 
 class MealResponse(BaseModel):
@@ -61,6 +99,8 @@ class MealResponse(BaseModel):
     cooking_ease: Optional[str] = None
     cooking_time: Optional[int] = None
     image_path: Optional[str] = None
+    # Resized copy for list pages, relative to assets/images; None until it has been rendered
+    card_image_path: Optional[str] = None
     ingredients: List[IngredientResponse] = []
     directions: List[DirectionResponse] = []
     log_entries: List[LogEntryResponse] = []
@@ -69,3 +109,131 @@ class MealResponse(BaseModel):
     class Config:
         orm_mode = True
 
+
+
+class MealSummary(BaseModel):
+    """A finder card: the meal's own columns and its log totals, without child rows."""
+    meal_id: int
+    name: str
+    description: Optional[str] = None
+    cuisine_type: Optional[str] = None
+    cooking_mode: Optional[str] = None
+    cooking_ease: Optional[str] = None
+    cooking_time: Optional[int] = None
+    image_path: Optional[str] = None
+    card_image_path: Optional[str] = None
+    meal_count: int = 0
+    recent_meal_date: Optional[date] = None
+    avg_rating: Optional[float] = None
+
+
+class MealSearchResult(BaseModel):
+    meal_id: int
+    name: str
+    description: Optional[str] = None
+    cuisine_type: Optional[str] = None
+    cooking_mode: Optional[str] = None
+    cooking_ease: Optional[str] = None
+    cooking_time: Optional[int] = None
+    image_path: Optional[str] = None
+    score: float
+    snippet: Optional[str] = None
+
+
+class MealMatch(BaseModel):
+    """A meal ranked against a pantry by /meals/match."""
+    meal_id: int
+    name: str
+    cuisine_type: Optional[str] = None
+    cooking_mode: Optional[str] = None
+    cooking_time: Optional[int] = None
+    image_path: Optional[str] = None
+    card_image_path: Optional[str] = None
+    coverage: float             # fraction of the meal's ingredients on hand
+    matched_count: int
+    missing_count: int
+    missing: List[str] = []     # names of the ingredients still needed
+
+
+class MealRecommendation(BaseModel):
+    """A meal suggested by /recommendations; components holds the per-factor scores in [0, 1]."""
+    meal_id: int
+    name: str
+    cuisine_type: Optional[str] = None
+    cooking_mode: Optional[str] = None
+    cooking_time: Optional[int] = None
+    image_path: Optional[str] = None
+    card_image_path: Optional[str] = None
+    days_since_cooked: Optional[int] = None     # None when never cooked
+    score: float
+    components: Dict[str, float]                # rating, recency, variety, similarity
+
+
+class ShoppingAmount(BaseModel):
+    quantity: Optional[float] = None    # None for "to taste" style entries
+    unit: Optional[str] = None
+
+
+class ShoppingItem(BaseModel):
+    """One ingredient of a shopping list, with its amounts summed per unit dimension."""
+    ingredient_id: int
+    name: str
+    amounts: List[ShoppingAmount] = []
+    meal_ids: List[int] = []
+
+
+class PlannedMeal(BaseModel):
+    date: date
+    meal_id: int
+    name: str
+    cuisine_type: Optional[str] = None
+    cooking_mode: Optional[str] = None
+    cooking_ease: Optional[str] = None
+    cooking_time: Optional[int] = None
+    image_path: Optional[str] = None
+    card_image_path: Optional[str] = None
+    score: float
+
+
+class MealPlan(BaseModel):
+    """A meal per day from start to end, and everything to buy for them."""
+    start: date
+    end: date
+    meals: List[PlannedMeal]
+    total_cooking_time: int
+    shopping_list: List[ShoppingItem]
+
+
+class CookCount(BaseModel):
+    period: date                # first day of the week (Monday) or month
+    cooks: int
+    meals: int                  # distinct meals cooked
+    avg_rating: Optional[float] = None
+
+
+class RatingTrendPoint(BaseModel):
+    period: date
+    key: Union[int, str, None]  # cuisine_type or meal_id
+    name: Optional[str] = None
+    avg_rating: float
+    ratings: int
+
+
+class CookingStreaks(BaseModel):
+    days_cooked: int
+    longest: int
+    longest_start: Optional[date] = None
+    longest_end: Optional[date] = None
+    current: int                # 0 unless something was cooked today or yesterday
+    current_start: Optional[date] = None
+    last_cooked: Optional[date] = None
+
+
+class NeglectedMeal(BaseModel):
+    meal_id: int
+    name: str
+    cuisine_type: Optional[str] = None
+    last_cooked: date
+    days_since: int
+    times_cooked: int
+    avg_rating: Optional[float] = None
@@ -0,0 +1,140 @@
+"""SQLite FTS5 full-text index over meals, their ingredients and directions.
+
+The MealSearch virtual table holds one row per meal (rowid = meal_id). The write
+paths in main.py call index_meal / remove_meal inside their own transaction so
+the index never drifts from the Meals tables.
+"""
+import re
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+# Column weights for bm25(): a hit in the name counts far more than one buried in a step
+BM25_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def create_search_index(engine):
+    """Create the MealSearch table if needed, filling it from existing meals on first run."""
+    with engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'MealSearch'"
+        )).first()
+        if exists:
+            return
+        conn.execute(text("""
+            CREATE VIRTUAL TABLE MealSearch USING fts5(
+                name, description, ingredients, directions,
+                tokenize = 'porter unicode61'
+            )
+        """))
+        _reindex(conn)
+
+
+def _reindex(conn, meal_ids=None):
+    """(Re)insert index rows for the given meals, or for every meal when meal_ids is None."""
+    where = "" if meal_ids is None else "WHERE m.meal_id IN (SELECT value FROM json_each(:ids))"
+    params = {} if meal_ids is None else {"ids": "[" + ",".join(str(int(i)) for i in meal_ids) + "]"}
+    if meal_ids is None:
+        conn.execute(text("DELETE FROM MealSearch"))
+    else:
+        conn.execute(text("DELETE FROM MealSearch WHERE rowid IN (SELECT value FROM json_each(:ids))"), params)
+    conn.execute(text(f"""
+        INSERT INTO MealSearch (rowid, name, description, ingredients, directions)
+        SELECT
+            m.meal_id,
+            coalesce(m.name, ''),
+            coalesce(m.description, ''),
+            coalesce((SELECT group_concat(i.name, ' ')
+                      FROM Meal_Ingredients mi JOIN Ingredients i ON i.ingredient_id = mi.ingredient_id
+                      WHERE mi.meal_id = m.meal_id), ''),
+            coalesce((SELECT group_concat(description, ' ')
+                      FROM (SELECT description FROM Directions d
+                            WHERE d.meal_id = m.meal_id ORDER BY d.step_number)), '')
+        FROM Meals m
+        {where}
+    """), params)
+
+
+def index_meal(db: Session, meal_id: int):
+    """Refresh the index row for one meal. Call after the meal's children are flushed."""
+    index_meals(db, [meal_id])
+
+
+def index_meals(db: Session, meal_ids):
+    db.flush()
+    _reindex(db.connection(), meal_ids)
+
+
+def add_documents(db: Session, documents):
+    """Index brand-new meals from dicts with meal_id, name, description, ingredients and directions
+    (the last two as lists of strings), without reading anything back from the Meals tables."""
+    params = [
+        {
+            "meal_id": d["meal_id"],
+            "name": d["name"] or "",
+            "description": d["description"] or "",
+            "ingredients": " ".join(d["ingredients"]),
+            "directions": " ".join(d["directions"]),
+        }
+        for d in documents
+    ]
+    if params:
+        db.execute(text("""
+            INSERT INTO MealSearch (rowid, name, description, ingredients, directions)
+            VALUES (:meal_id, :name, :description, :ingredients, :directions)
+        """), params)
+
+
+def remove_meal(db: Session, meal_id: int):
+    db.execute(text("DELETE FROM MealSearch WHERE rowid = :meal_id"), {"meal_id": meal_id})
+
+
+def rebuild_search_index(db: Session):
+    _reindex(db.connection())
+
+
+def to_match_query(q: str):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix.
+
+    Words are quoted so user input can never be parsed as FTS5 syntax.
+    """
+    tokens = _TOKEN_RE.findall(q)
+    if not tokens:
+        return None
+    terms = [f'"{t}"' for t in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_meals(db: Session, q: str, limit: int = 20):
+    match = to_match_query(q)
+    if match is None:
+        return []
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    return db.execute(text(f"""
+        SELECT
+            m.meal_id, m.name, m.description, m.cuisine_type, m.cooking_mode,
+            m.cooking_ease, m.cooking_time, m.image_path,
+            bm25(MealSearch, {weights}) AS score,
+            snippet(MealSearch, -1, '<b>', '</b>', '…', 12) AS snippet
+        FROM MealSearch
+        JOIN Meals m ON m.meal_id = MealSearch.rowid
+        WHERE MealSearch MATCH :match
+        ORDER BY score
+        LIMIT :limit
+    """), {"match": match, "limit": limit}).all()
+
+
+if __name__ == '__main__':
+    from db_config import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rebuild_search_index(db)
+        db.commit()
+    finally:
+        db.close()
+    print('search index rebuilt')
@@ -0,0 +1,50 @@
+"""Run the app on several worker processes, one per CPU core by default.
+
+    python serve.py
+    python serve.py --workers 4 --host 0.0.0.0 --port 8000
+
+Plain `uvicorn main:app` serves everything from one process and one core. Here
+uvicorn's supervisor starts the workers and restarts any that die. Each worker
+keeps its own in-process caches (cache.py), so they share a change log file,
+DATA_VERSION_FILE: a write in one worker moves the data version in all of them.
+They also share one BOOT_ID, so an ETag from any worker is valid at every other.
+
+The startup checks in db_config (new tables, columns and indexes, search index,
+MealStats) run once here before the workers start; STARTUP_CHECKS_DONE tells the
+workers to skip them, so they don't race each other.
+"""
+import argparse
+import os
+import uuid
+
+import uvicorn
+
+
+def default_workers() -> int:
+    if os.environ.get("WEB_CONCURRENCY"):
+        return int(os.environ["WEB_CONCURRENCY"])
+    # The cores this process may use, which a container can limit below os.cpu_count()
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    # Read by the workers when they import cache and http_cache
+    version_file = os.environ.setdefault("DATA_VERSION_FILE", "data/data_version.log")
+    os.environ["BOOT_ID"] = uuid.uuid4().hex[:8]
+    # The new BOOT_ID already invalidates every old tag, so versions can start over
+    if os.path.exists(version_file):
+        os.unlink(version_file)
+
+    import db_config
+    db_config.engine.dispose()
+    os.environ["STARTUP_CHECKS_DONE"] = "1"
+
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
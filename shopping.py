@@ -0,0 +1,116 @@
+"""Shopping lists: the per-recipe ingredient amounts of several meals, summed.
+
+Amounts are converted to a base unit per dimension (ml for volume, grams for mass,
+pieces for counts) before adding, so "3 tbsp" and "1 cup" of the same ingredient
+become one line. The total is shown in the largest unit the recipes used that
+keeps it at 1 or more. Units not in UNITS are only added to the same spelling.
+"""
+from collections import defaultdict
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Ingredient, meal_ingredients_association_table
+
+
+# unit -> (dimension, size in the dimension's base unit)
+UNITS = {
+    "ml": ("volume", 1.0),
+    "l": ("volume", 1000.0),
+    "tsp": ("volume", 4.92892),
+    "tbsp": ("volume", 14.7868),
+    "fl oz": ("volume", 29.5735),
+    "cup": ("volume", 236.588),
+    "pint": ("volume", 473.176),
+    "quart": ("volume", 946.353),
+    "gallon": ("volume", 3785.41),
+    "mg": ("mass", 0.001),
+    "g": ("mass", 1.0),
+    "kg": ("mass", 1000.0),
+    "oz": ("mass", 28.3495),
+    "lb": ("mass", 453.592),
+    "piece": ("count", 1.0),
+    "dozen": ("count", 12.0),
+}
+_ALIASES = {
+    "milliliter": "ml", "millilitre": "ml", "liter": "l", "litre": "l",
+    "teaspoon": "tsp", "tablespoon": "tbsp", "tbs": "tbsp", "tbl": "tbsp",
+    "fluid ounce": "fl oz", "floz": "fl oz", "c": "cup", "pt": "pint", "qt": "quart", "gal": "gallon",
+    "milligram": "mg", "gram": "g", "gr": "g", "kilogram": "kg", "kilo": "kg",
+    "ounce": "oz", "pound": "lb", "lbs": "lb",
+    "whole": "piece", "each": "piece", "ea": "piece", "pc": "piece", "pcs": "piece", "": "piece",
+}
+# Recipe shorthand where case is the only difference, so checked before lowercasing
+_CASE_SENSITIVE = {"T": "tbsp", "t": "tsp"}
+
+
+def canonical_unit(unit) -> str:
+    """Lower case, no trailing period or plural: "Tablespoons" -> "tbsp", "grams" -> "g"."""
+    unit = (unit or "").strip().rstrip(".")
+    if unit in _CASE_SENSITIVE:
+        return _CASE_SENSITIVE[unit]
+    unit = unit.lower()
+    if unit in UNITS or unit in _ALIASES:
+        return _ALIASES.get(unit, unit)
+    if unit.endswith("es") and unit[:-2] in _ALIASES:
+        return _ALIASES[unit[:-2]]
+    if unit.endswith("s") and (unit[:-1] in UNITS or unit[:-1] in _ALIASES):
+        return _ALIASES.get(unit[:-1], unit[:-1])
+    return unit
+
+
+def _display(total: float, used: set[str]):
+    """Express a base-unit total in the largest used unit that keeps it >= 1."""
+    by_size = sorted(used, key=lambda u: UNITS[u][1], reverse=True)
+    unit = next((u for u in by_size if total >= UNITS[u][1]), by_size[-1])
+    return round(total / UNITS[unit][1], 2), unit
+
+
+def shopping_list(db: Session, meal_ids) -> list[dict]:
+    """Summed amounts of every ingredient of meal_ids (a meal listed twice counts twice),
+    as dicts in schemas.ShoppingItem's shape, sorted by ingredient name."""
+    servings = defaultdict(int)
+    for meal_id in meal_ids:
+        servings[meal_id] += 1
+    if not servings:
+        return []
+    assoc = meal_ingredients_association_table
+    rows = db.connection().execute(
+        select(assoc.c.meal_id, assoc.c.quantity, assoc.c.unit, Ingredient.ingredient_id, Ingredient.name)
+        .join(Ingredient, Ingredient.ingredient_id == assoc.c.ingredient_id)
+        .where(assoc.c.meal_id.in_(list(servings)))
+    )
+
+    items = {}
+    for r in rows:
+        item = items.setdefault(r.ingredient_id, {
+            "name": r.name, "meal_ids": set(), "base": defaultdict(float), "used": defaultdict(set),
+            "other": defaultdict(float), "unmeasured": set(),
+        })
+        item["meal_ids"].add(r.meal_id)
+        unit = canonical_unit(r.unit)
+        if r.quantity is None:
+            item["unmeasured"].add(r.unit or None)
+        elif unit in UNITS:
+            dimension, size = UNITS[unit]
+            item["base"][dimension] += r.quantity * size * servings[r.meal_id]
+            item["used"][dimension].add(unit)
+        else:
+            item["other"][unit] += r.quantity * servings[r.meal_id]
+
+    results = []
+    for ingredient_id, item in items.items():
+        amounts = [
+            dict(zip(("quantity", "unit"), _display(total, item["used"][dimension])))
+            for dimension, total in item["base"].items()
+        ]
+        amounts += [{"quantity": round(total, 2), "unit": unit} for unit, total in item["other"].items()]
+        amounts += [{"quantity": None, "unit": unit} for unit in item["unmeasured"]]
+        results.append({
+            "ingredient_id": ingredient_id,
+            "name": item["name"],
+            "amounts": amounts,
+            "meal_ids": sorted(item["meal_ids"]),
+        })
+    results.sort(key=lambda item: (item["name"] or "").lower())
+    return results
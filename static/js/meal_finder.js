@@ -18,29 +18,24 @@ document.addEventListener("DOMContentLoaded", () => {
     const modeSelect = document.getElementById("filter-mode");
     const easeSelect = document.getElementById("filter-ease");
     const clearBtn = document.getElementById("clear-filters-btn");
+    const nextLabel = nextBtn.textContent;
 
-    let skip = 0;
     const limit = 102;
-    let allMeals = [];
+    let afterId = null;
+    let searchTimer = null;
+    let requestSeq = 0;
 
     function renderMeals(meals) {
-        mealList.innerHTML = "";
         meals.forEach(meal => {
-            let meal_count, recent_meal_date;
-            if (meal.meal_stats.length > 0) {
-                meal_count = meal.meal_stats[0]['meal_count'];
-                recent_meal_date = meal.meal_stats[0]['recent_meal_date'];
-            } else {
-                meal_count = 0;
-                recent_meal_date = 'Never eaten';
-            }
+            const meal_count = meal.meal_count;
+            const recent_meal_date = meal.recent_meal_date || 'Never eaten';
 
             const mealCard = document.createElement("div");
             mealCard.className = "col-md-6 col-lg-4 mb-3 d-flex align-items-stretch";
 
             mealCard.innerHTML = `
                 <div id="meal_${meal.meal_id}" class="card shadow-med">
-                    <img src="/assets/images/${meal.image_path}" || '/assets/images/image.jpg'}" class="card-img-top" max-height="275" style="object-fit: contain;">
+                    <img src="/assets/images/${meal.card_image_path || meal.image_path || 'image.jpg'}" loading="lazy" class="card-img-top" max-height="275" style="object-fit: contain;">
                     <div class="card-body">
                         <h5 class="card-title">${meal.name}</h5>
                         <p class="card-text">${meal.description || "No description available."}</p>
@@ -61,59 +56,63 @@ document.addEventListener("DOMContentLoaded", () => {
         });
     }
 
-    function filterMeals() {
-        const searchTerm = searchInput.value.toLowerCase();
-        const cuisine = cuisineSelect.value;
-        const mode = modeSelect.value;
-        const ease = easeSelect.value;
-
-        const filtered = allMeals.filter(meal => {
-            if (searchTerm) {
-                const name = (meal.name || "").toLowerCase();
-                const desc = (meal.description || "").toLowerCase();
-                if (!name.includes(searchTerm) && !desc.includes(searchTerm)) return false;
-            }
-            if (cuisine && meal.cuisine_type !== cuisine) return false;
-            if (mode && meal.cooking_mode !== mode) return false;
-            if (ease && meal.cooking_ease !== ease) return false;
-            return true;
-        });
-
-        renderMeals(filtered);
+    // Builds the /meals/summary query string from the current filters and page cursor
+    function buildQuery() {
+        const params = new URLSearchParams({limit: limit});
+        const searchTerm = searchInput.value.trim();
+        if (searchTerm) params.set("q", searchTerm);
+        if (cuisineSelect.value) params.set("cuisine_type", cuisineSelect.value);
+        if (modeSelect.value) params.set("cooking_mode", modeSelect.value);
+        if (easeSelect.value) params.set("cooking_ease", easeSelect.value);
+        if (afterId !== null) params.set("after_id", afterId);
+        return params.toString();
     }
 
     async function fetchMeals() {
+        const seq = ++requestSeq;
         try {
-            const response = await fetch(`/meals/?skip=${skip}&limit=${limit}`);
+            const response = await fetch(`/meals/summary?${buildQuery()}`);
             if (!response.ok) throw new Error("Failed to fetch meals");
 
             const meals = await response.json();
-            if (meals.length === 0) {
+            if (seq !== requestSeq) return;  // Filters changed while this page was in flight
+            if (meals.length > 0) {
+                renderMeals(meals);
+                afterId = meals[meals.length - 1].meal_id;
+            }
+            if (meals.length < limit) {
                 nextBtn.disabled = true;
                 nextBtn.textContent = "No more meals";
-                return;
             }
-
-            allMeals = allMeals.concat(meals);
-            filterMeals();
-            skip += limit;
         } catch (error) {
             console.error(error);
             alert("Error fetching meals. Please try again later.");
         }
     }
 
-    searchInput.addEventListener("input", filterMeals);
-    cuisineSelect.addEventListener("change", filterMeals);
-    modeSelect.addEventListener("change", filterMeals);
-    easeSelect.addEventListener("change", filterMeals);
+    // Starts over from the first page whenever a filter changes
+    function resetAndFetch() {
+        afterId = null;
+        mealList.innerHTML = "";
+        nextBtn.disabled = false;
+        nextBtn.textContent = nextLabel;
+        fetchMeals();
+    }
+
+    searchInput.addEventListener("input", () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(resetAndFetch, 250);
+    });
+    cuisineSelect.addEventListener("change", resetAndFetch);
+    modeSelect.addEventListener("change", resetAndFetch);
+    easeSelect.addEventListener("change", resetAndFetch);
 
     clearBtn.addEventListener("click", () => {
         searchInput.value = "";
         cuisineSelect.value = "";
         modeSelect.value = "";
         easeSelect.value = "";
-        renderMeals(allMeals);
+        resetAndFetch();
     });
 
     nextBtn.addEventListener("click", fetchMeals);
@@ -133,10 +133,14 @@ document.getElementById('submit-btn')?.addEventListener('click', function() {
         const logEntryDate = item.querySelector(`input[name^="log_entry_date_"]`).value;
         const logEntryRating = item.querySelector(`input[name^="log_entry_rating_"]`).value;
         const logEntryNotes = item.querySelector(`textarea[name^="log_entry_notes_"]`).value;
-        if (logEntryDate != ''){
+        // Entries stored without a date (an old one that couldn't be parsed) are sent
+        // with date null so they are kept; clearing a date still removes the entry
+        if (logEntryDate != '' || item.dataset.undated){
             //logEntryNum++;
             jsonData.log_entries.push({
-                date: logEntryDate,
+                // Lets the server update this entry in place instead of replacing it
+                log_entry_id: item.dataset.logEntryId ? parseInt(item.dataset.logEntryId, 10) : null,
+                date: logEntryDate || null,
                 rating: logEntryRating ? parseInt(logEntryRating, 10) : null,
                 notes: logEntryNotes
             });
@@ -175,7 +179,7 @@ document.getElementById('submit-btn')?.addEventListener('click', function() {
         console.log('Success:', data);
         // Assuming success, now upload the image
 
-        uploadImage();
+        uploadImage(data.meal_id);
         showToast('success', 'Success', 'Meal has been saved!');
         // Redirect after a short delay so user can see the toast
         setTimeout(() => {
@@ -256,14 +260,13 @@ function addMealLogEntry() {
     container.appendChild(newRow);
 }
 
-function uploadImage() {
+function uploadImage(mealId) {
     const form = document.getElementById('uploadForm');
     if (!form) {
         console.error('Form element not found');
         return;
     }
-    //const mealId = document.getElementById('meal_id').value;
-    if (!mealData['meal_id']) {
+    if (!mealId) {
         console.error('Meal ID is required');
         return;
     }
@@ -276,7 +279,7 @@ function uploadImage() {
 
     const formData = new FormData(form);
     console.log('made it here', formData)
-    fetch(`/meals/${mealData['meal_id']}/upload-image/`, {
+    fetch(`/meals/${mealId}/upload-image/`, {
         method: 'POST',
         body: formData
     })
@@ -341,9 +344,12 @@ $(document).ready(function(){
     $.each(mealData['logEntries'], function(k,v){
         log_entry_num++;
         addMealLogEntry()
+        const logRow = document.getElementById('mealLogContainer').lastElementChild;
+        logRow.dataset.logEntryId = v['log_entry_id'];
+        if (!v['date']) logRow.dataset.undated = 'true';
         $('input[name="log_entry_date_'+log_entry_num+'"]').val(v['date']);
         $('input[name="log_entry_rating_'+log_entry_num+'"]').val(v['rating']);
-        $('input[name="log_entry_notes_'+log_entry_num+'"]').val(v['notes']);
+        $('textarea[name="log_entry_notes_'+log_entry_num+'"]').val(v['notes']);
     })
 
     document.getElementById('image_uploader').addEventListener('change', function(event) {
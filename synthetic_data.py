@@ -0,0 +1,172 @@
+"""Seeded synthetic meal databases for benchmarking.
+
+    python synthetic_data.py --meals 10000 --seed 0
+
+The same size and seed always produce the same file. Ingredient use follows a Zipf
+curve (a few staples are in everything, most ingredients are rare), and every cuisine
+leans on its own staples, so meals overlap the way real recipes do. The cooking log
+spans `years` years before a fixed end date: favourite meals are cooked far more
+often than the rest, and each meal's ratings scatter around its own quality.
+
+Rows are written straight into a fresh file (create_all plus raw executemany), then
+the search index and MealStats are built as on first start, so the app opens it ready.
+"""
+import argparse
+import os
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine
+
+from models import Base
+from ingredients import normalize
+from search import create_search_index
+from meal_stats import ensure_meal_stats
+
+
+OUTPUT_DIR = "data/bench"
+END_DATE = date(2025, 12, 31)
+
+CUISINES = {
+    "Italian": ["pasta", "risotto", "bake", "soup", "pizza"],
+    "Mexican": ["tacos", "enchiladas", "bowl", "quesadillas", "chili"],
+    "Thai": ["curry", "stir fry", "noodles", "salad", "soup"],
+    "Indian": ["curry", "dal", "biryani", "masala", "tikka"],
+    "American": ["burgers", "casserole", "sandwiches", "roast", "skillet"],
+    "Chinese": ["stir fry", "fried rice", "dumplings", "noodles", "braise"],
+    "Japanese": ["donburi", "ramen", "teriyaki", "curry", "udon"],
+    "Mediterranean": ["traybake", "salad", "flatbreads", "stew", "skewers"],
+}
+MODES = ["Bake", "Grill", "Stovetop", "Instant Pot", "Slow Cooker", "No Cook"]
+EASES = ["quick", "weeknight", "weekend"]
+_BASES = """
+salt onion garlic olive-oil butter black-pepper egg flour sugar lemon tomato carrot celery potato rice
+chicken-breast chicken-thigh ground-beef pork-shoulder bacon salmon shrimp cod tofu chickpea lentil
+black-bean kidney-bean milk cream parmesan mozzarella cheddar feta yogurt basil parsley cilantro mint
+thyme rosemary oregano cumin coriander paprika chili-flake turmeric garam-masala ginger soy-sauce
+fish-sauce sesame-oil rice-vinegar coconut-milk lime scallion bell-pepper jalapeno zucchini eggplant
+spinach kale cabbage broccoli cauliflower mushroom pea corn avocado cucumber red-onion shallot leek
+sweet-potato spaghetti penne egg-noodle rice-noodle tortilla pita bread breadcrumb chicken-stock
+beef-stock tomato-paste canned-tomato honey maple-syrup brown-sugar mustard mayonnaise ketchup
+worcestershire-sauce hoisin-sauce oyster-sauce miso peanut cashew almond walnut pine-nut sesame-seed
+bay-leaf cinnamon nutmeg cardamom clove star-anise vanilla white-wine red-wine lemongrass galangal
+""".split()
+_VARIETIES = ["", "smoked", "fresh", "dried", "organic", "baby", "roasted", "spicy", "sweet", "wild", "aged", "toasted"]
+# unit -> (low, high) quantity
+_UNITS = {"g": (50, 800), "cup": (0.25, 3), "tbsp": (0.5, 4), "tsp": (0.25, 3), "piece": (1, 6),
+          "ml": (50, 500), "oz": (2, 16), "lb": (0.5, 3)}
+
+
+def default_path(meals: int, seed: int) -> str:
+    return f"{OUTPUT_DIR}/meals-{meals}-seed{seed}.db"
+
+
+def _vocabulary(rng):
+    names = [(f"{variety} {base}" if variety else base).replace("-", " ") for variety in _VARIETIES for base in _BASES]
+    # Plain staples first so they get the head of the Zipf curve, varieties shuffled behind them
+    head, tail = names[:len(_BASES)], names[len(_BASES):]
+    rng.shuffle(head)
+    rng.shuffle(tail)
+    # "sweet" + "potato" is "sweet potato" again; canonical names are unique
+    names = list({normalize(name): name for name in reversed(head + tail)}.values())[::-1]
+    weights = 1.0 / np.arange(1, len(names) + 1) ** 1.1
+    return names, weights / weights.sum()
+
+
+def generate(path: str, meals: int, seed: int = 0, years: int = 3, logs_per_meal: float = 2.0):
+    """Write a database with `meals` meals to path. Returns a summary dict."""
+    rng = np.random.default_rng(seed)
+    names, popularity = _vocabulary(rng)
+    units = rng.choice(list(_UNITS), size=len(names))
+    cuisines = list(CUISINES)
+    staples = {c: rng.choice(400, size=30, replace=False) for c in cuisines}
+
+    meal_rows, link_rows, direction_rows = [], [], []
+    meal_cuisine = rng.integers(len(cuisines), size=meals)
+    for i in range(meals):
+        meal_id = i + 1
+        cuisine = cuisines[meal_cuisine[i]]
+        count = int(rng.integers(6, 19))
+        from_staples = rng.choice(staples[cuisine], size=min(count // 2, 30), replace=False)
+        rest = rng.choice(len(names), size=count, replace=False, p=popularity)
+        chosen = list(dict.fromkeys(np.concatenate([from_staples, rest]).tolist()))[:count]
+        main = names[chosen[0]]
+        dish = CUISINES[cuisine][int(rng.integers(len(CUISINES[cuisine])))]
+        meal_rows.append((
+            meal_id, f"{main.title()} {dish.title()}",
+            f"A {cuisine.lower()} {dish} with {', '.join(names[k] for k in chosen[1:4])}.",
+            cuisine, MODES[int(rng.integers(len(MODES)))], EASES[int(rng.integers(len(EASES)))],
+            int(rng.integers(2, 25)) * 5,
+        ))
+        for k in chosen:
+            low, high = _UNITS[units[k]]
+            link_rows.append((meal_id, k + 1, round(float(rng.uniform(low, high)), 2), str(units[k])))
+        for step in range(1, int(rng.integers(3, 11)) + 1):
+            direction_rows.append((meal_id, step, f"Step {step}: prepare the {names[chosen[step % len(chosen)]]}."))
+
+    # Favourites: a shuffled Zipf over meals; ratings scatter around each meal's quality
+    log_count = int(meals * logs_per_meal)
+    favourite = rng.permutation(meals)
+    meal_weights = 1.0 / np.arange(1, meals + 1) ** 0.9
+    cooked = favourite[rng.choice(meals, size=log_count, p=meal_weights / meal_weights.sum())] + 1
+    days = rng.integers(0, 365 * years, size=log_count)
+    quality = rng.uniform(2.5, 5.0, size=meals)
+    ratings = np.clip(np.rint(quality[cooked - 1] + rng.normal(0, 0.7, size=log_count)), 1, 5).astype(int)
+    ratings[rng.random(log_count) < 0.15] = 0      # not rated
+    log_rows = [
+        (int(m), (END_DATE - timedelta(days=int(d))).isoformat(), int(r), None)
+        for m, d, r in zip(cooked, days, ratings)
+    ]
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.part"
+    if os.path.exists(tmp):
+        os.unlink(tmp)
+    engine = create_engine(f"sqlite:///{tmp}")
+    Base.metadata.create_all(bind=engine)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.executemany("INSERT INTO Ingredients (ingredient_id, name, canonical_name) VALUES (?, ?, ?)",
+                           [(k + 1, name, normalize(name)) for k, name in enumerate(names)])
+        cursor.executemany("INSERT INTO Meals (meal_id, name, description, cuisine_type, cooking_mode, cooking_ease, "
+                           "cooking_time) VALUES (?, ?, ?, ?, ?, ?, ?)", meal_rows)
+        cursor.executemany("INSERT INTO Meal_Ingredients (meal_id, ingredient_id, quantity, unit) VALUES (?, ?, ?, ?)", link_rows)
+        cursor.executemany("INSERT INTO Directions (meal_id, step_number, description) VALUES (?, ?, ?)", direction_rows)
+        cursor.executemany("INSERT INTO LogEntries (meal_id, date, rating, notes) VALUES (?, ?, ?, ?)", log_rows)
+        raw.commit()
+    finally:
+        raw.close()
+    create_search_index(engine)
+    ensure_meal_stats(engine)
+    engine.dispose()
+    os.replace(tmp, path)
+    return {"path": path, "meals": meals, "seed": seed, "ingredients": len(names),
+            "ingredient_links": len(link_rows), "log_entries": log_count, "years": years}
+
+
+def ensure_dataset(meals: int, seed: int = 0, path: str = None, **options) -> str:
+    """Path of the dataset for this size and seed, generating it if it isn't there yet."""
+    path = path or default_path(meals, seed)
+    if not os.path.exists(path):
+        generate(path, meals, seed, **options)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meals", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--logs-per-meal", type=float, default=2.0)
+    parser.add_argument("--force", action="store_true", help="regenerate files that already exist")
+    args = parser.parse_args()
+    for n in args.meals:
+        target = default_path(n, args.seed)
+        if os.path.exists(target) and not args.force:
+            print(f"{target} exists")
+            continue
+        summary = generate(target, n, args.seed, args.years, args.logs_per_meal)
+        print(f"{target}: {summary['meals']} meals, {summary['ingredient_links']} ingredient links, "
+              f"{summary['log_entries']} log entries over {summary['years']} years")
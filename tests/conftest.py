@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# db_config binds its engine at import: point it at a scratch database first.
+# The app opens templates/ and static/ relative to the working directory.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
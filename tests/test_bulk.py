@@ -0,0 +1,81 @@
+"""Bulk inserts send a fixed number of statements, however many meals are in the batch."""
+from contextlib import contextmanager
+
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+
+import bulk
+from db_config import SessionLocal
+from models import Meal
+from schemas import MealCreate
+
+
+@contextmanager
+def record_statements():
+    """Collects the SQL of every statement sent by any engine while the block runs."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+
+def _meals(n: int, tag: str) -> list[MealCreate]:
+    return [
+        MealCreate(
+            name=f"Bulk {tag} {i}",
+            description="For the bulk statement-count test",
+            ingredients=[{"name": f"bulk {tag} ingredient {i % 7}", "quantity": 1, "unit": "cup"}],
+            directions=[{"step_number": 1, "description": "Cook"}],
+            log_entries=[{"date": "2025-02-01", "rating": 3}],
+        )
+        for i in range(n)
+    ]
+
+
+def _insert(meals):
+    db = SessionLocal()
+    try:
+        with record_statements() as statements:
+            meal_ids = bulk.insert_meals(db, meals)
+        names = dict(db.execute(select(Meal.meal_id, Meal.name).where(Meal.meal_id.in_(meal_ids))).all())
+        db.rollback()
+    finally:
+        db.close()
+    assert [names[meal_id] for meal_id in meal_ids] == [m.name for m in meals]
+    return statements
+
+
+def _count(statements, prefix):
+    return sum(statement.startswith(prefix) for statement in statements)
+
+
+def test_insert_meals_statement_count():
+    for n in (2, 20, 200):
+        statements = _insert(_meals(n, f"meals{n}"))
+        # The first meal alone, then all the others in one executemany
+        assert _count(statements, 'INSERT INTO "Meals"') == 2, statements
+
+
+def test_insert_meals_statement_count_is_constant():
+    counts = {n: len(_insert(_meals(n, f"total{n}"))) for n in (2, 20, 200)}
+    assert len(set(counts.values())) == 1, counts
+
+
+def test_new_ingredients_are_one_insert():
+    meals = [MealCreate(name="Bulk many ingredients", description="Forty new ingredients", ingredients=[{"name": f"bulk new ingredient {k}"} for k in range(40)])]
+    db = SessionLocal()
+    try:
+        with record_statements() as statements:
+            meal_id, = bulk.insert_meals(db, meals)
+        ingredients, _, _ = bulk.load_children(db, [meal_id])
+        db.rollback()
+    finally:
+        db.close()
+    assert _count(statements, 'INSERT INTO "Ingredients"') == 1, statements
+    assert sorted(i["name"] for i in ingredients[meal_id]) == sorted(i.name for i in meals[0].ingredients)
@@ -0,0 +1,69 @@
+"""GET /meals/ loads a page with a fixed number of statements, whatever its size."""
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from main import app
+
+
+@contextmanager
+def count_statements():
+    """Counts every statement sent by any engine while the block runs."""
+    counter = {"statements": 0}
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        counter["statements"] += 1
+
+    event.listen(Engine, "before_cursor_execute", count)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, "before_cursor_execute", count)
+
+
+def _meal(i: int) -> dict:
+    # Children counts vary per meal, so a per-meal query would show up as a difference
+    return {
+        "name": f"Test meal {i}",
+        "description": "For the query-count test",
+        "cuisine_type": "Italian",
+        "ingredients": [{"name": f"ingredient {k}", "quantity": 1, "unit": "cup"} for k in range(i % 5 + 1)],
+        "directions": [{"step_number": k, "description": f"Step {k}"} for k in range(1, i % 4 + 2)],
+        "log_entries": [{"date": f"2025-01-{k + 1:02d}", "rating": 4} for k in range(i % 3)],
+    }
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        for i in range(60):
+            client.post("/meals/", json=_meal(i)).raise_for_status()
+        yield client
+
+
+def _statements(client, url: str):
+    with count_statements() as counter:
+        response = client.get(url)
+    response.raise_for_status()
+    return counter["statements"], response.json()
+
+
+def test_read_meals_statement_count_is_constant(client):
+    counts = {}
+    for limit in (1, 10, 50):
+        counts[limit], meals = _statements(client, f"/meals/?limit={limit}")
+        assert len(meals) == limit
+        assert all(meal["ingredients"] and meal["directions"] for meal in meals)
+    # The page, one query per child table and the stats: never one per meal
+    assert len(set(counts.values())) == 1, counts
+    assert counts[1] <= 6, counts
+
+
+def test_read_meals_filtered_page_statement_count(client):
+    count, meals = _statements(client, "/meals/?limit=1")
+    filtered_count, meals = _statements(client, "/meals/?cuisine_type=Italian&after_id=20&limit=25")
+    assert len(meals) == 25
+    assert filtered_count == count
@@ -0,0 +1,83 @@
+"""Saving a meal only rewrites the children that changed; the others keep their rows."""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+
+from cache import data_version
+from db_config import SessionLocal
+from main import app
+from models import LogEntry
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def meal(client):
+    body = {
+        "name": "Updated meal",
+        "description": "For the diff-update tests",
+        "ingredients": [{"name": "update flour", "quantity": 2, "unit": "cup"}],
+        "directions": [{"step_number": 1, "description": "Mix"}],
+        "log_entries": [
+            {"date": "2025-01-01", "rating": 3, "notes": "first"},
+            {"date": "2025-02-01", "rating": 4, "notes": "second"},
+            {"date": "2025-03-01", "rating": 5, "notes": "old text date"},
+        ],
+    }
+    meal_id = client.post("/meals/", json=body).json()["meal_id"]
+    # As log_dates leaves an entry whose stored text date couldn't be parsed
+    db = SessionLocal()
+    try:
+        db.execute(update(LogEntry).where(LogEntry.meal_id == meal_id, LogEntry.notes == "old text date").values(date=None))
+        db.commit()
+    finally:
+        db.close()
+    data_version.bump([meal_id])
+    return client.get(f"/meals/{meal_id}").json()
+
+
+def _stored_entries(meal_id):
+    db = SessionLocal()
+    try:
+        return {
+            r.log_entry_id: (r.date and r.date.isoformat(), r.rating, r.notes)
+            for r in db.execute(select(LogEntry.log_entry_id, LogEntry.date, LogEntry.rating, LogEntry.notes)
+                                .where(LogEntry.meal_id == meal_id))
+        }
+    finally:
+        db.close()
+
+
+def test_patch_without_log_entries_keeps_them(client, meal):
+    before = _stored_entries(meal["meal_id"])
+    client.patch(f"/meals/{meal['meal_id']}", json={"name": "Renamed meal"}).raise_for_status()
+    assert _stored_entries(meal["meal_id"]) == before
+    assert len(before) == 3
+
+
+def test_form_save_keeps_untouched_and_undated_entries(client, meal):
+    before = _stored_entries(meal["meal_id"])
+    # What the form sends: every entry with its id, the undated one with date null
+    entries = [{k: e[k] for k in ("log_entry_id", "date", "rating", "notes")} for e in meal["log_entries"]]
+    assert [e["date"] for e in entries].count(None) == 1
+    changed = next(e for e in entries if e["notes"] == "second")
+    changed["rating"] = 1
+    body = {k: meal[k] for k in ("name", "description", "ingredients", "directions")}
+    client.put(f"/meals/{meal['meal_id']}", json={**body, "log_entries": entries}).raise_for_status()
+
+    after = _stored_entries(meal["meal_id"])
+    assert set(after) == set(before)
+    assert after[changed["log_entry_id"]] == ("2025-02-01", 1, "second")
+    assert {k: v for k, v in after.items() if k != changed["log_entry_id"]} == \
+        {k: v for k, v in before.items() if k != changed["log_entry_id"]}
+    stats, = client.get(f"/meals/{meal['meal_id']}").json()["meal_stats"]
+    assert (stats["first_meal_date"], stats["recent_meal_date"], stats["meal_count"]) == ("2025-01-01", "2025-02-01", 3)
+
+
+def test_new_log_entry_needs_a_date(client, meal):
+    response = client.patch(f"/meals/{meal['meal_id']}", json={"log_entries": [{"date": None, "rating": 2}]})
+    assert response.status_code == 422
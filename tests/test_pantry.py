@@ -0,0 +1,90 @@
+"""The pantry matrix refreshed for changed meals equals one built from scratch."""
+import dataclasses
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from cache import data_version
+from db_config import SessionLocal
+from main import app
+from pantry import PantryMatcher, pantry_matcher
+
+
+def _meal(name: str, mode: str, ingredients) -> dict:
+    return {
+        "name": name,
+        "description": "For the pantry tests",
+        "cooking_mode": mode,
+        "cooking_time": 30,
+        "ingredients": [{"name": n, "quantity": 1, "unit": "cup"} for n in ingredients],
+    }
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def assert_matches_full_build():
+    db = SessionLocal()
+    try:
+        incremental = pantry_matcher.matrix(db)
+        full = PantryMatcher()._build(db, data_version.value)
+    finally:
+        db.close()
+    assert incremental.version == full.version
+    for field in dataclasses.fields(full):
+        a, b = getattr(incremental, field.name), getattr(full, field.name)
+        if isinstance(b, np.ndarray):
+            assert a.dtype.kind == b.dtype.kind, field.name
+            assert np.array_equal(a, b, equal_nan=b.dtype.kind == "f"), field.name
+
+
+def _match(client, **params):
+    response = client.get("/meals/match", params={"have": "pantry onion,pantry garlic", **params})
+    response.raise_for_status()
+    return [m["meal_id"] for m in response.json()]
+
+
+def test_new_longer_cooking_mode(client):
+    oven = client.post("/meals/", json=_meal("Oven dish", "Oven", ["pantry onion", "pantry rice"])).json()["meal_id"]
+    assert oven in _match(client)   # builds the matrix
+    slow = client.post("/meals/", json=_meal("Slow dish", "Slow cooker", ["pantry garlic"])).json()["meal_id"]
+
+    assert _match(client, cooking_mode="Slow cooker") == [slow]
+    assert _match(client, cooking_mode="Oven") == [oven]
+    assert_matches_full_build()
+
+
+def test_incremental_refresh_after_each_kind_of_write(client):
+    meal_id = client.post("/meals/", json=_meal("Edited dish", "Grill", ["pantry onion"])).json()["meal_id"]
+    _match(client)
+    writes = [
+        {"log_entries": [{"date": "2025-03-01", "rating": 4}]},
+        {"name": "Renamed dish"},
+        {"cooking_time": 95, "cooking_mode": "Air fryer with rotisserie"},
+        {"ingredients": [{"name": "pantry garlic"}, {"name": "pantry saffron"}]},
+    ]
+    for body in writes:
+        client.patch(f"/meals/{meal_id}", json=body).raise_for_status()
+        assert_matches_full_build()
+
+    client.delete(f"/meals/{meal_id}").raise_for_status()
+    assert_matches_full_build()
+    assert meal_id not in _match(client)
+
+
+def test_log_write_keeps_the_matrix_arrays(client):
+    meal_id = client.post("/meals/", json=_meal("Logged dish", "Grill", ["pantry onion"])).json()["meal_id"]
+    db = SessionLocal()
+    try:
+        before = pantry_matcher.matrix(db)
+        client.patch(f"/meals/{meal_id}", json={"log_entries": [{"date": "2025-04-01", "rating": 5}]}).raise_for_status()
+        after = pantry_matcher.matrix(db)
+    finally:
+        db.close()
+    # Re-tagged, not rebuilt: no links or filter attributes changed
+    assert after.version > before.version
+    assert after.indices is before.indices
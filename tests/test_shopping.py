@@ -0,0 +1,13 @@
+"""Units are folded to one spelling before amounts are summed."""
+import pytest
+
+from shopping import canonical_unit
+
+
+@pytest.mark.parametrize("unit, expected", [
+    ("T", "tbsp"), ("T.", "tbsp"), ("Tbsp", "tbsp"), ("Tablespoons", "tbsp"),
+    ("t", "tsp"), ("tsp.", "tsp"), ("teaspoons", "tsp"),
+    ("C", "cup"), ("grams", "g"), ("Lbs", "lb"), (None, "piece"),
+])
+def test_canonical_unit(unit, expected):
+    assert canonical_unit(unit) == expected